@@ -0,0 +1,334 @@
+import importlib.util
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import circuit_breaker
+import frame_store
+import http_cache
+import perf
+import snapshot
+from lazy_imports import lazy_module
+
+# pandas, pyarrow and requests are imported on first use so a cold worker can start
+# rendering the page while they load on the prefetch threads
+pd = lazy_module("pandas")
+if importlib.util.find_spec("pyarrow") is not None:
+    pa = lazy_module("pyarrow")
+    pq = lazy_module("pyarrow.parquet")
+else:  # pragma: no cover - pyarrow ships with streamlit, but stay usable without it
+    pa = None
+
+API_BASE_URL = os.environ.get("API_BASE_URL", "https://api.11232020.xyz")
+
+# per-process settings; each streamlit worker holds its own pool
+POOL_SIZE = int(os.environ.get("API_POOL_SIZE", 10))
+CONNECT_TIMEOUT = float(os.environ.get("API_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("API_READ_TIMEOUT", 30))
+MAX_RETRIES = int(os.environ.get("API_MAX_RETRIES", 3))
+BACKOFF_FACTOR = float(os.environ.get("API_BACKOFF_FACTOR", 0.5))
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+JSON = "application/json"
+
+# columnar responses are preferred for tabular endpoints; servers that don't know them send json
+COLUMNAR_TRANSPORT = pa is not None and os.environ.get("API_COLUMNAR_TRANSPORT", "1") != "0"
+FRAME_ACCEPT = f"{ARROW_STREAM}, {PARQUET};q=0.9, {JSON};q=0.5" if COLUMNAR_TRANSPORT else JSON
+
+# stale-while-revalidate: an expired cache entry or stored frame is returned at once and
+# refreshed on a background thread, and the last good data is served while the api is
+# failing. set to 0 to block on the api instead (builds that must not publish old data)
+SERVE_STALE = os.environ.get("API_SERVE_STALE", "1") != "0"
+REVALIDATE_WORKERS = int(os.environ.get("API_REVALIDATE_WORKERS", 4))
+
+_session = None
+_session_lock = threading.Lock()
+
+_revalidator = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="revalidate")
+# cache key -> future of its background refresh, so each key is refreshed once at a time
+_refreshing = {}
+# cache key -> data version of the stale data served for it, until a refresh succeeds
+_stale = {}
+# bumped whenever a background refresh brings in new content (see cache_version)
+_generation = 0
+_state_lock = threading.Lock()
+
+
+class ApiUnavailable(Exception):
+    """
+    the api timed out, refused the connection, answered 5xx, or its circuit is open
+    """
+
+
+def _build_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.request import ACCEPT_ENCODING
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        backoff_factor=BACKOFF_FACTOR,
+        raise_on_status=False,  # hand the last response back so raise_for_status reports it
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # urllib3 only advertises br/zstd when the matching decoder is installed
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+    return session
+
+
+def get_session():
+    """
+    returns the process-wide keep-alive session, creating it on first use
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _endpoint(path):
+    # breakers are per route, e.g. every /skill_proportions/by_category/... combination shares one
+    return "/" + path.strip("/").split("/")[0]
+
+
+def _get(path, params=None, headers=None):
+    """
+    one GET through the endpoint's circuit breaker. connection errors, timeouts (after
+    the session's retries) and 5xx responses count as failures and raise ApiUnavailable
+    """
+    import requests
+
+    breaker = circuit_breaker.breaker(_endpoint(path))
+    try:
+        breaker.before_call()
+    except circuit_breaker.CircuitOpen as e:
+        perf.annotate(circuit="open")
+        raise ApiUnavailable(str(e)) from e
+    try:
+        r = get_session().get(f"{API_BASE_URL}{path}", params=params, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    except requests.RequestException as e:
+        breaker.record_failure()
+        raise ApiUnavailable(f"{path}: {e}") from e
+    if r.status_code >= 500:
+        breaker.record_failure()
+        raise ApiUnavailable(f"{path}: {r.status_code} {r.reason}")
+    breaker.record_success()
+    return r
+
+
+def _mark_stale(key, data_version):
+    with _state_lock:
+        _stale[key] = data_version
+
+
+def _refreshed(key, changed):
+    global _generation
+    with _state_lock:
+        _stale.pop(key, None)
+        if changed:
+            _generation += 1
+
+
+def _in_background(key, fn, *args):
+    """
+    runs fn(*args) on the revalidation pool unless key is already being refreshed
+    """
+    with _state_lock:
+        running = _refreshing.get(key)
+        if running is not None and not running.done():
+            return running
+        future = _refreshing[key] = _revalidator.submit(fn, *args)
+    return future
+
+
+def stale_data_version():
+    """
+    the oldest data version among responses currently served stale, or None if all
+    data is current
+    """
+    with _state_lock:
+        return min(_stale.values(), default=None)
+
+
+def cache_version():
+    """
+    key for in-memory caches of api data: the current data version, suffixed with a
+    counter once background refreshes replace stale data, so getters that cached the
+    stale copy are recomputed on the next rerun
+    """
+    data_version = http_cache.current_data_version()
+    return f"{data_version}+{_generation}" if _generation else data_version
+
+
+def _revalidate(path, params, accept, entry):
+    fresh = fetch(path, params=params, accept=accept, serve_stale=False)
+    _refreshed(entry.key, changed=fresh.fetched_at != entry.fetched_at)
+
+
+def fetch(path, params=None, accept=JSON, cache=True, serve_stale=None):
+    """
+    GETs API_BASE_URL + path through the disk cache.
+    entries validated since the last nightly refresh are served without a request;
+    older ones are revalidated with If-None-Match/If-Modified-Since so an unchanged
+    payload costs a 304 instead of a full download. with serve_stale (default
+    SERVE_STALE) that revalidation happens in the background and the old entry is
+    returned right away; it is also returned when the api is unavailable. with
+    cache=False the response is neither looked up nor stored, for one-off requests
+    like month deltas.
+    returns a http_cache.CacheEntry
+    """
+    if serve_stale is None:
+        serve_stale = SERVE_STALE
+    key = http_cache.cache_key(f"{API_BASE_URL}{path}", params, accept=accept)
+    if not cache:
+        r = _get(path, params=params, headers={"Accept": accept})
+        if r.status_code == 406 and accept != JSON:
+            return fetch(path, params=params, accept=JSON, cache=False)
+        r.raise_for_status()
+        perf.annotate(disk_cache="bypass", bytes=len(r.content))
+        return http_cache.CacheEntry(key, r.content, content_type=r.headers.get("Content-Type"))
+    entry = http_cache.load(key)
+    if entry is not None and entry.is_fresh():
+        http_cache.record("hits")
+        perf.annotate(disk_cache="hit")
+        return entry
+
+    if entry is not None and serve_stale:
+        http_cache.record("stale")
+        perf.annotate(disk_cache="stale")
+        _mark_stale(key, entry.data_version())
+        _in_background(key, _revalidate, path, params, accept, entry)
+        return entry
+
+    headers = entry.conditional_headers() if entry is not None else {}
+    headers["Accept"] = accept
+    r = _get(path, params=params, headers=headers)
+    if r.status_code == 406 and accept != JSON:
+        return fetch(path, params=params, accept=JSON, serve_stale=serve_stale)
+    if r.status_code == 304 and entry is not None:
+        http_cache.record("revalidated")
+        perf.annotate(disk_cache="revalidated")
+        return http_cache.mark_revalidated(entry)
+
+    r.raise_for_status()
+    http_cache.record("misses")
+    perf.annotate(disk_cache="miss", bytes=len(r.content))
+    return http_cache.store(key, r)
+
+
+def _unwrap(data):
+    # some endpoints wrap their records
+    if isinstance(data, dict) and "results" in data:
+        data = data["results"]
+    return data
+
+
+def get_json(path, params=None):
+    table = snapshot.lookup(path, params)
+    if table is not None:
+        with perf.span("decode", format="snapshot"):
+            return table.to_pylist()
+    with perf.span("http", path=path):
+        entry = fetch(path, params=params)
+    with perf.span("decode", format=JSON):
+        return _unwrap(json.loads(entry.content))
+
+
+def decode_frame(content, content_type):
+    """
+    turns a response body into a dataframe based on its media type.
+    arrow buffers wrap the bytes without copying, and split_blocks/self_destruct
+    let numeric columns land in pandas without an extra consolidated copy. the table
+    is local, so self_destruct can release its buffers as they're converted
+    """
+    media_type = (content_type or JSON).split(";")[0].strip()
+    if media_type == ARROW_STREAM:
+        table = pa.ipc.open_stream(pa.py_buffer(content)).read_all()
+    elif media_type in (PARQUET, "application/x-parquet"):
+        table = pq.read_table(pa.BufferReader(content))
+    else:
+        return pd.DataFrame(_unwrap(json.loads(content)))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def get_frame(path, params=None):
+    """
+    fetches a tabular endpoint, asking for arrow/parquet and falling back to json.
+    both getters read from the shared snapshot instead when one is built for the data version
+    """
+    table = snapshot.lookup(path, params)
+    if table is not None:
+        with perf.span("decode", format="snapshot"):
+            return table.to_pandas(split_blocks=True)
+    with perf.span("http", path=path):
+        entry = fetch(path, params=params, accept=FRAME_ACCEPT)
+    with perf.span("decode", format=entry.content_type):
+        return decode_frame(entry.content, entry.content_type)
+
+
+def get_time_series(path, params=None):
+    """
+    get_frame for endpoints keyed by year_month. the last frame is kept in frame_store and,
+    once the data version moves on, only rows from its latest month onwards are requested
+    and upserted into it, so a refresh costs the same however long the history gets.
+    with SERVE_STALE the stored frame is returned while that refresh runs in the background
+    """
+    if not frame_store.INCREMENTAL_REFRESH or snapshot.current_snapshot() is not None:
+        return get_frame(path, params=params)
+
+    # keyed by server like fetch's entries, so frames from one api are never served for another
+    key = http_cache.cache_key(f"{API_BASE_URL}{path}", params)
+    data_version = http_cache.current_data_version()
+    stored = frame_store.load(key)
+    if stored is not None and stored.data_version == data_version:
+        perf.annotate(refresh="stored")
+        return stored.frame
+
+    if stored is not None and SERVE_STALE:
+        perf.annotate(refresh="stale")
+        _mark_stale(key, stored.data_version)
+        _in_background(key, _refresh_time_series, path, params, key, stored, data_version)
+        return stored.frame
+    return _refresh_time_series(path, params, key, stored, data_version)
+
+
+def _refresh_time_series(path, params, key, stored, data_version):
+    # the frame is stored as current for data_version, so never from a stale cache entry
+    now = datetime.now(timezone.utc).isoformat()
+    if stored is None or stored.needs_full_refresh():
+        perf.annotate(refresh="full")
+        with perf.span("http", path=path):
+            entry = fetch(path, params=params, accept=FRAME_ACCEPT, serve_stale=False)
+        with perf.span("decode", format=entry.content_type):
+            frame = decode_frame(entry.content, entry.content_type)
+        frame = frame_store.store(key, frame, data_version, full_at=now).frame
+        if stored is not None:
+            _refreshed(key, changed=not frame.equals(stored.frame))
+        return frame
+
+    since = stored.latest_month()
+    with perf.span("http", path=path, since=since):
+        entry = fetch(path, params={**(params or {}), frame_store.SINCE_PARAM: since}, accept=FRAME_ACCEPT, cache=False)
+    with perf.span("decode", format=entry.content_type):
+        delta = decode_frame(entry.content, entry.content_type)
+    frame, is_full = frame_store.merge_months(stored.frame, delta, since)
+    perf.annotate(refresh="full" if is_full else "delta", delta_rows=len(delta))
+    frame = frame_store.store(key, frame, data_version, full_at=now if is_full else stored.full_at).frame
+    # an unchanged frame leaves cache_version alone, so in-memory getters keep their entries
+    _refreshed(key, changed=not frame.equals(stored.frame))
+    return frame
@@ -0,0 +1,84 @@
+"""
+times skill_incidence.SkillIncidence: building the job x skill matrix from /job_skills rows,
+and counting co-occurrence pairs for the selections the network graph's date range and
+sidebar produce, at production volume and at 10x the number of postings. pair counts are
+checked against counting every posting's skill pairs in plain python at 1x.
+
+    python benchmarks/bench_cooccurrence.py [--scales 1x 10x] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from itertools import combinations
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import best_time
+from benchmarks.synthetic import job_skills_records
+from skill_incidence import SkillIncidence
+
+# about 3,000 relevant postings a week for a year and a half
+SCALES = {
+    "1x": dict(n_jobs=20_000, n_skills=300, n_months=18),
+    "10x": dict(n_jobs=200_000, n_skills=1_000, n_months=36),
+}
+
+SELECTIONS = {
+    "everything": dict(),
+    "6 months": dict(start="2024-03-01", end="2024-08-01"),
+    "6 months, category": dict(start="2024-03-01", end="2024-08-01", job_category="data_engineer"),
+    "6 months, sidebar": dict(start="2024-03-01", end="2024-08-01", job_category="data_engineer", country="us", seniority="mid"),
+}
+
+
+def reference_pairs(rows, start=None, end=None, job_category=None, country=None, seniority=None, proportion_threshold=0.01):
+    """
+    SkillIncidence.pairs as {(a, b): count}, by counting each selected posting's skill pairs
+    """
+    filters = {"job_category": job_category, "binned_seniority": seniority}
+    if country != "all":
+        filters["country"] = country
+    skills_by_job = {}
+    for row in rows.itertuples(index=False):
+        month = row.year_month[:7]
+        if (start is not None and month < start[:7]) or (end is not None and month > end[:7]):
+            continue
+        if any(value is not None and getattr(row, column) != value for column, value in filters.items()):
+            continue
+        skills_by_job.setdefault(row.job_id, set()).add(row.skill)
+    counts = Counter(pair for skills in skills_by_job.values() for pair in combinations(sorted(skills), 2))
+    return {pair: n for pair, n in counts.items() if n >= max(proportion_threshold * len(skills_by_job), 1)}
+
+
+def check_pairs(rows, incidence):
+    for selection in SELECTIONS.values():
+        counted = {tuple(item["pair"]): item["count"] for item in incidence.pairs(**selection)}
+        assert counted == reference_pairs(rows, **selection), selection
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scale':<6} {'selection':<20} {'jobs':>10} {'pairs':>7} {'ms':>9}")
+    for scale in args.scales:
+        rows = pd.DataFrame(job_skills_records(**SCALES[scale]))
+        build_seconds, incidence = best_time(SkillIncidence.from_frame, rows, repeat=1)
+        matrix = incidence.matrix
+        matrix_mib = (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 2**20
+        print(f"{scale:<6} {'build':<20} {incidence.n_jobs:>10,} {'':>7} {build_seconds * 1e3:>9.1f}"
+              f"   ({len(rows):,} rows, {matrix.nnz:,} nonzeros, {matrix_mib:.1f} MiB)")
+        if scale == "1x":
+            check_pairs(rows, incidence)
+        for name, selection in SELECTIONS.items():
+            seconds, pairs = best_time(incidence.pairs, repeat=args.repeat, **selection)
+            print(f"{scale:<6} {name:<20} {len(incidence.select(**selection)):>10,} {len(pairs):>7,} {seconds * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
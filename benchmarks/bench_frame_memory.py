@@ -0,0 +1,71 @@
+"""
+compares the memory each session pays for the cached data frames: as fetched vs after
+data_helpers.compact_frame, and handed out by st.cache_data (a fresh unpickled copy per
+call) vs the shared cache (a read_only_view of one frame per process).
+
+    python benchmarks/bench_frame_memory.py [--scale 10]
+"""
+import argparse
+import os
+import pickle
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import best_time, traced_peak
+from benchmarks.synthetic import (JOB_CATEGORIES, salary_stats_records, seniority_stats_records,
+                                  skill_proportions_records)
+from data_helpers import compact_frame, read_only_view
+
+
+def as_fetched(records):
+    # the dtypes api_client.get_frame returns for an arrow response
+    return pa.Table.from_pylist(records).to_pandas(split_blocks=True)
+
+
+def frames(n_months):
+    yield "salary_stats", as_fetched(salary_stats_records(n_months=n_months))
+    yield "seniority_stats", as_fetched(seniority_stats_records(n_months=n_months))
+    # every (category, country, seniority) combination, like get_skill_proportions_cube
+    combos = [
+        as_fetched(skill_proportions_records(n_months=n_months, n_skills=60, job_category=category, seed=i))
+        for i, category in enumerate(JOB_CATEGORIES * 12)
+    ]
+    yield "skill_proportions x60", pd.concat(combos, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1, help="multiply the number of months")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'frame':<22} {'dtypes':<8} {'rows':>8} {'frame MiB':>10} {'pickle MiB':>11} "
+          f"{'cache_data ms':>14} {'per call MiB':>13} {'shared ms':>10} {'per call MiB':>13}")
+    totals = {}
+    for name, fetched in frames(18 * args.scale):
+        for dtypes, df in (("fetched", fetched), ("compact", compact_frame(fetched))):
+            frame_bytes = df.memory_usage(deep=True).sum()
+            blob = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+            unpickle_seconds, _ = best_time(pickle.loads, blob, repeat=args.repeat)
+            unpickle_peak, _ = traced_peak(pickle.loads, blob)
+            view_seconds, _ = best_time(read_only_view, df, repeat=args.repeat)
+            view_peak, _ = traced_peak(read_only_view, df)
+            print(f"{name:<22} {dtypes:<8} {len(df):>8,} {frame_bytes / 2**20:>10.2f} {len(blob) / 2**20:>11.2f} "
+                  f"{unpickle_seconds * 1e3:>14.2f} {unpickle_peak / 2**20:>13.2f} "
+                  f"{view_seconds * 1e3:>10.3f} {view_peak / 2**20:>13.3f}")
+            totals.setdefault(dtypes, [0, 0])
+            totals[dtypes][0] += unpickle_peak
+            totals[dtypes][1] += view_peak
+
+    print("\nallocated per session render, all frames:")
+    print(f"  st.cache_data, fetched dtypes: {totals['fetched'][0] / 2**20:.2f} MiB")
+    print(f"  st.cache_data, compact dtypes: {totals['compact'][0] / 2**20:.2f} MiB")
+    print(f"  shared cache, compact dtypes:  {totals['compact'][1] / 2**20:.3f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+checks the cold-start import cost of the app's own modules against a budget.
+
+streamlit is imported first (every worker pays for it regardless), then the modules
+jobs-app.py imports, under `python -X importtime` in a fresh interpreter. exits non-zero
+when they take longer than --budget-ms or pull in a module that should load lazily.
+
+    python benchmarks/bench_import_time.py [--budget-ms 100] [--top 10]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_MODULES = ["plot_helpers", "data_helpers", "api_client", "http_cache", "perf", "stoc"]
+
+# only needed once data arrives or a particular section renders
+DEFERRED_MODULES = ["pandas", "numpy", "networkx", "scipy", "plotly.express", "pyarrow", "requests"]
+
+# with everything heavy deferred the app modules import in ~10ms; the budget leaves room for slow disks
+IMPORT_BUDGET_MS = 100
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure():
+    """
+    returns the importtime rows [(self_us, cumulative_us, depth, module)] for the app
+    modules, and the deferred modules that ended up in sys.modules anyway
+    """
+    code = (
+        "import streamlit, sys\n"
+        "print('--- app ---', file=sys.stderr)\n"
+        f"import {', '.join(APP_MODULES)}\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    stderr = result.stderr.split("--- app ---", 1)[1]
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, module))
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return rows, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="number of heaviest modules to list")
+    args = parser.parse_args()
+
+    rows, loaded = measure()
+    total_ms = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0) / 1e3
+
+    print(f"{'module':<40} {'self ms':>9} {'cumulative ms':>14}")
+    for self_us, cumulative_us, _, module in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"{module:<40} {self_us / 1e3:>9.1f} {cumulative_us / 1e3:>14.1f}")
+    print(f"\napp modules after streamlit: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if total_ms > args.budget_ms:
+        print("over budget")
+        failed = True
+    if loaded:
+        print(f"imported eagerly but should load on first use: {', '.join(loaded)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+layout latency against node/edge count for the networkx layouts and the sparse stress backend.
+
+    python benchmarks/bench_layouts.py [--sizes 50 100 200 500 1000 2000 5000] [--max-seconds 20]
+
+an algorithm is skipped at larger sizes once one run exceeds --max-seconds.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from layout_helpers import sparse_stress_layout
+
+LAYOUTS = {
+    "Kamada-Kawai Layout": nx.kamada_kawai_layout,
+    "Spring Layout": nx.spring_layout,
+    "Sparse Stress Layout": sparse_stress_layout,
+}
+
+
+def cooccurrence_graph(n_nodes, seed=0):
+    """
+    scale-free with clustering, like skill co-occurrence; weights normalized to (0, 1]
+    as create_network_graph does
+    """
+    G = nx.powerlaw_cluster_graph(n_nodes, 4, 0.3, seed=seed)
+    rng = random.Random(seed)
+    for u, v in G.edges:
+        G[u][v]["weight"] = rng.randint(1, 300) / 300
+    return G
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 500, 1000, 2000, 5000])
+    parser.add_argument("--max-seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    too_slow = set()
+    print(f"{'nodes':>6} {'edges':>7}  " + "  ".join(f"{name:>22}" for name in LAYOUTS))
+    for n_nodes in args.sizes:
+        G = cooccurrence_graph(n_nodes)
+        cells = []
+        for name, layout in LAYOUTS.items():
+            if name in too_slow:
+                cells.append(f"{'skipped':>22}")
+                continue
+            start = time.perf_counter()
+            layout(G)
+            seconds = time.perf_counter() - start
+            if seconds > args.max_seconds:
+                too_slow.add(name)
+            cells.append(f"{seconds * 1e3:>19.1f} ms")
+        print(f"{n_nodes:>6} {G.number_of_edges():>7}  " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
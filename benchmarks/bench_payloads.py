@@ -0,0 +1,60 @@
+"""
+reports the bytes each heatmap and network figure ships to the browser, with plain json
+lists vs plot_helpers' compact payloads (float32 typed arrays, adaptive cell labels),
+raw and gzipped, at production volume and at 10x / 100x.
+
+    python benchmarks/bench_payloads.py [--scales 1x 10x 100x]
+"""
+import argparse
+import gzip
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plot_helpers
+from benchmarks.bench_plot_helpers import SCALES
+from benchmarks.synthetic import skill_frequencies_records, skill_proportions_records
+from data_helpers import NETWORK_ALPHA, NETWORK_MAX_EDGES, NETWORK_TOP_K
+
+
+def figures(n_months, n_skills, n_edges):
+    skill_props = pd.DataFrame(skill_proportions_records(n_months=n_months, n_skills=n_skills))
+    pairs = skill_frequencies_records(n_skills=n_skills, n_edges=n_edges)
+    # the page caps the heatmap at 40 skills; the uncapped matrix shows the label cutoff
+    for top_n in (40, None):
+        matrix = plot_helpers.build_skill_matrix(skill_props, top_n=top_n)
+        yield (f"heatmap[top {top_n or 'all'}]",
+               lambda compact: plot_helpers.create_skill_heatmap(matrix, height=700, width=800, compact=compact))
+    for name, backbone in (("network", {}),
+                           ("network[backbone]", dict(top_k=NETWORK_TOP_K, alpha=NETWORK_ALPHA, max_edges=NETWORK_MAX_EDGES))):
+        yield name, lambda compact, backbone=backbone: plot_helpers.create_network_graph(
+            "Data Engineer", pairs, "2024-01-01 to 2025-06-01", layout_algo="Sparse Stress Layout", k=0,
+            edge_scaling_factor=3.0, compact=compact, **backbone
+        )
+
+
+def payload_sizes(fig):
+    payload = fig.to_json().encode()
+    return len(payload), len(gzip.compress(payload))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    args = parser.parse_args()
+
+    print(f"{'scale':<6} {'figure':<20} {'json KiB':>10} {'compact KiB':>12} {'ratio':>6} "
+          f"{'gzip KiB':>10} {'compact gzip':>13} {'ratio':>6}")
+    for scale in args.scales:
+        for name, build in figures(**SCALES[scale]):
+            plain, plain_gz = payload_sizes(build(False))
+            compact, compact_gz = payload_sizes(build(True))
+            print(f"{scale:<6} {name:<20} {plain / 1024:>10.1f} {compact / 1024:>12.1f} {compact / plain:>6.2f} "
+                  f"{plain_gz / 1024:>10.1f} {compact_gz / 1024:>13.1f} {compact_gz / plain_gz:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+times the plot_helpers figure builders on synthetic data at production volume and at
+10x / 100x, reporting wall time, peak traced memory and figure json size.
+
+    python benchmarks/bench_plot_helpers.py [--scales 1x 10x 100x] [--repeat 3]
+        [--output results.json] [--compare baseline.json --tolerance 0.25]
+
+with --compare, any builder that got slower, hungrier or bigger than the baseline by
+more than the tolerance is listed and the script exits non-zero.
+
+builders are called cold: figure memoization and the layout cache are bypassed.
+kamada-kawai is only run at 1x; it takes minutes on graphs of ~1k nodes.
+graph_helpers.backbone_pairs is checked against a plain-python version at every scale.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plot_helpers
+from graph_helpers import backbone_pairs
+from data_helpers import NETWORK_ALPHA, NETWORK_MAX_EDGES, NETWORK_TOP_K
+from benchmarks.harness import best_time, traced_peak
+from benchmarks.synthetic import (salary_stats_records, seniority_stats_records,
+                                  skill_frequencies_records, skill_proportions_records)
+
+SCALES = {
+    "1x": dict(n_months=18, n_skills=60, n_edges=500),
+    "10x": dict(n_months=60, n_skills=300, n_edges=2_000),
+    "100x": dict(n_months=120, n_skills=1_000, n_edges=10_000),
+}
+
+
+def cases(n_months, n_skills, n_edges):
+    salary = pd.DataFrame(salary_stats_records(n_months=n_months))
+    seniority = pd.DataFrame(seniority_stats_records(n_months=n_months))
+    skill_props = pd.DataFrame(skill_proportions_records(n_months=n_months, n_skills=n_skills))
+    pairs = skill_frequencies_records(n_skills=n_skills, n_edges=n_edges)
+
+    def network(layout_algo, **backbone):
+        def build():
+            plot_helpers._layout_cache.clear()
+            return plot_helpers.create_network_graph(
+                "Data Engineer", pairs, "2024-01-01 to 2025-06-01", layout_algo=layout_algo, k=0, edge_scaling_factor=3.0,
+                **backbone
+            )
+        return build
+
+    yield "create_seniority_plot", len(seniority), lambda: plot_helpers.create_seniority_plot.__wrapped__(seniority)
+    yield "create_salary_plot", len(salary), lambda: plot_helpers.create_salary_plot.__wrapped__(salary)
+    yield "create_skill_heatmap", len(skill_props), lambda: plot_helpers.create_skill_heatmap(
+        plot_helpers.build_skill_matrix(skill_props), height=700, width=800
+    )
+    yield "create_network_graph[kk]", len(pairs), network("Kamada-Kawai Layout")
+    yield "create_network_graph[kk+backbone]", len(pairs), network(
+        "Kamada-Kawai Layout", top_k=NETWORK_TOP_K, alpha=NETWORK_ALPHA, max_edges=NETWORK_MAX_EDGES
+    )
+    yield "create_network_graph[sparse]", len(pairs), network("Sparse Stress Layout")
+    yield "create_network_graph[sparse+backbone]", len(pairs), network(
+        "Sparse Stress Layout", top_k=NETWORK_TOP_K, alpha=NETWORK_ALPHA, max_edges=NETWORK_MAX_EDGES
+    )
+
+
+def reference_backbone(pairs, top_k=None, alpha=None, max_edges=None):
+    """
+    backbone_pairs one edge at a time: the top_k heaviest edges of each skill (ties in
+    input order), the disparity filter's p-value per endpoint, then the heaviest max_edges
+    """
+    incident, strength = defaultdict(list), defaultdict(float)
+    for i, item in enumerate(pairs):
+        for skill in item["pair"][:2]:
+            incident[skill].append(i)
+            strength[skill] += item["count"]
+
+    def p_value(i, skill):
+        return (1 - pairs[i]["count"] / strength[skill]) ** (len(incident[skill]) - 1)
+
+    keep = set(range(len(pairs))) if top_k is None and alpha is None else set()
+    if top_k is not None:
+        for edges in incident.values():
+            keep.update(sorted(edges, key=lambda i: (-pairs[i]["count"], i))[:top_k])
+    if alpha is not None:
+        keep.update(i for i, item in enumerate(pairs) if min(p_value(i, skill) for skill in item["pair"][:2]) < alpha)
+    kept = sorted(keep)
+    if max_edges is not None and len(kept) > max_edges:
+        kept = sorted(sorted(kept, key=lambda i: -pairs[i]["count"])[:max_edges])
+    return [pairs[i] for i in kept]
+
+
+def check_backbone(pairs):
+    for backbone in (dict(top_k=NETWORK_TOP_K), dict(alpha=NETWORK_ALPHA), dict(max_edges=NETWORK_MAX_EDGES),
+                     dict(top_k=NETWORK_TOP_K, alpha=NETWORK_ALPHA, max_edges=NETWORK_MAX_EDGES)):
+        assert backbone_pairs(pairs, **backbone) == reference_backbone(pairs, **backbone), backbone
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as json")
+    parser.add_argument("--compare", help="baseline json written by --output")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scale':<6} {'builder':<38} {'rows':>7} {'wall ms':>10} {'peak MiB':>10} {'json KiB':>10}")
+    for scale in args.scales:
+        check_backbone(skill_frequencies_records(n_skills=SCALES[scale]["n_skills"], n_edges=SCALES[scale]["n_edges"]))
+        for name, rows, build in cases(**SCALES[scale]):
+            if "[kk" in name and scale != "1x":
+                print(f"{scale:<6} {name:<38} {rows:>7} {'skipped':>10}")
+                continue
+            build()  # warm up plotly's lazy imports and validators
+            peak, fig = traced_peak(build)
+            seconds, fig = best_time(build, repeat=args.repeat)
+            size = len(fig.to_json())
+            results[f"{scale}/{name}"] = {"seconds": seconds, "peak_bytes": peak, "json_bytes": size}
+            print(f"{scale:<6} {name:<38} {rows:>7} {seconds * 1e3:>10.1f} {peak / 2**20:>10.1f} {size / 1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = [
+            f"{case} {metric}: {baseline[case][metric]:,.3f} -> {value:,.3f}"
+            for case, metrics in results.items() if case in baseline
+            for metric, value in metrics.items()
+            if value > baseline[case][metric] * (1 + args.tolerance)
+        ]
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+times data_helpers.rolling_series, which smooths the monthly salary / seniority series on
+the client, against pandas' grouped rolling, for a few smoothing windows at production
+volume and at 10x / 100x the number of months.
+
+    python benchmarks/bench_smoothing.py [--windows 3 6 12] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import best_time
+from benchmarks.synthetic import salary_stats_records
+from data_helpers import SERIES_COLUMNS, compact_frame, rolling_series
+
+SCALES = {"1x": 18, "10x": 180, "100x": 1_800}
+
+
+def pandas_rolling(df, window):
+    rolled = df.groupby(list(SERIES_COLUMNS), observed=True)['smoothed_value'].rolling(window, min_periods=1).median()
+    return rolled.reset_index(level=list(range(len(SERIES_COLUMNS))), drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", type=int, nargs="+", default=[3, 6, 12])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'scale':<6} {'rows':>8} {'window':>7} {'rolling_series ms':>18} {'pandas ms':>10}")
+    for scale, n_months in SCALES.items():
+        # compacted and sorted by month, as the getters hand them out
+        df = compact_frame(pd.DataFrame(salary_stats_records(n_months=n_months)))
+        for window in args.windows:
+            ours, smoothed = best_time(rolling_series, df, window, repeat=args.repeat)
+            theirs, expected = best_time(pandas_rolling, df, window, repeat=args.repeat)
+            assert np.allclose(smoothed['smoothed_value'], expected.sort_index(), equal_nan=True)
+            print(f"{scale:<6} {len(df):>8,} {window:>7} {ours * 1e3:>18.2f} {theirs * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
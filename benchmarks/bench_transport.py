@@ -0,0 +1,87 @@
+"""
+compares decode time and peak memory (rss growth) of json vs arrow ipc vs parquet bodies
+for the salary_stats and skill_proportions payloads.
+
+    python benchmarks/bench_transport.py [--scale 10]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import ARROW_STREAM, JSON, PARQUET, decode_frame
+from benchmarks.harness import best_time, peak_rss_growth
+from benchmarks.synthetic import salary_stats_records, skill_proportions_records
+
+
+def encode(records):
+    table = pa.Table.from_pandas(pd.DataFrame(records), preserve_index=False)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+
+    return {
+        JSON: json.dumps(records).encode(),
+        ARROW_STREAM: sink.getvalue().to_pybytes(),
+        PARQUET: parquet.getvalue(),
+    }
+
+
+def decode_peak_rss(content, content_type):
+    """
+    decodes once in a fresh interpreter so earlier runs don't leave memory to reuse
+    """
+    with tempfile.NamedTemporaryFile(suffix=".body") as f:
+        f.write(content)
+        f.flush()
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", content_type, f.name],
+            check=True, capture_output=True, text=True
+        )
+    return int(out.stdout.strip())
+
+
+def child(content_type, path):
+    with open(path, "rb") as f:
+        content = f.read()
+    peak, _ = peak_rss_growth(decode_frame, content, content_type)
+    print(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1, help="multiply the number of months")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    payloads = {
+        "salary_stats": salary_stats_records(n_months=18 * args.scale),
+        "skill_proportions": skill_proportions_records(n_months=18 * args.scale, n_skills=60),
+    }
+
+    print(f"{'payload':<18} {'format':<38} {'rows':>7} {'bytes':>10} {'decode ms':>10} {'peak +MiB':>10}")
+    for name, records in payloads.items():
+        for content_type, content in encode(records).items():
+            seconds, _ = best_time(decode_frame, content, content_type, repeat=args.repeat)
+            peak = decode_peak_rss(content, content_type)
+            print(f"{name:<18} {content_type:<38} {len(records):>7} {len(content):>10,} {seconds * 1e3:>10.2f} {peak / 2**20:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+timing and memory helpers shared by the benchmark scripts
+"""
+import time
+import tracemalloc
+
+
+def best_time(fn, *args, repeat=5, **kwargs):
+    """
+    returns (fastest wall time in seconds, result of the last call)
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _status_kib(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+
+
+def peak_rss_growth(fn, *args, **kwargs):
+    """
+    calls fn once and returns (bytes the peak rss rose above the starting rss, result).
+    tracemalloc can't see arrow's allocator and isn't safe with its worker threads, so
+    this resets the kernel's high-water mark instead (linux only)
+    """
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = _status_kib("VmRSS:")
+    result = fn(*args, **kwargs)
+    return (_status_kib("VmHWM:") - before) * 1024, result
+
+
+def traced_peak(fn, *args, **kwargs):
+    """
+    calls fn once and returns (peak bytes allocated through python/numpy, result).
+    unlike rss this isn't hidden by memory the allocator kept from earlier runs,
+    but it misses arrow's own allocator
+    """
+    tracemalloc.start()
+    try:
+        result = fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, result
@@ -0,0 +1,104 @@
+"""
+synthetic payloads shaped like the API responses, for benchmarks and load tests
+"""
+import random
+
+import pandas as pd
+
+JOB_CATEGORIES = ['machine_learning_engineer', 'software_engineer', 'data_engineer', 'data_scientist', 'data_analyst']
+SENIORITIES = ['Intern', 'Entry Level', 'Mid-Level', 'Senior-Level', 'Leadership']
+COUNTRIES = ['us', 'canada']
+
+
+def months(n_months, start="2024-01-01"):
+    return [d.strftime("%Y-%m-%d") for d in pd.date_range(start, periods=n_months, freq="MS")]
+
+
+def salary_stats_records(n_months=18, seed=0):
+    """
+    rows like /salary_stats and /seniority_stats: one per month x category x country x seniority
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "year_month": month,
+            "job_category": category,
+            "country": country,
+            "binned_seniority": seniority,
+            "smoothed_value": rng.uniform(60_000, 220_000),
+        }
+        for month in months(n_months)
+        for category in JOB_CATEGORIES
+        for country in COUNTRIES
+        for seniority in SENIORITIES
+    ]
+
+
+def seniority_stats_records(n_months=18, seed=0):
+    """
+    rows like /seniority_stats: share of each seniority per month x category x country
+    """
+    records = salary_stats_records(n_months=n_months, seed=seed)
+    rng = random.Random(seed)
+    for record in records:
+        record["smoothed_value"] = rng.random()
+    return records
+
+
+def skill_proportions_records(n_months=18, n_skills=60, job_category="data_engineer", seed=0):
+    """
+    rows like /skill_proportions/by_category/...: one per month x skill
+    """
+    rng = random.Random(seed)
+    skills = [f"skill_{i}" for i in range(n_skills)]
+    records = []
+    for month in months(n_months):
+        total_jobs = rng.randint(50, 500)
+        for skill in skills:
+            records.append({
+                "year_month": month,
+                "job_category": job_category,
+                "skill": skill,
+                "proportion": round(rng.random(), 2),
+                "total_jobs": total_jobs,
+            })
+    return records
+
+
+def skill_frequencies_records(n_skills=60, n_edges=500, seed=0):
+    """
+    pairs like /skill_frequencies/by_category/...: [{"pair": [a, b], "count": n}, ...].
+    pairs are drawn with a skew towards low-numbered skills, as a few skills dominate
+    """
+    rng = random.Random(seed)
+    skills = [f"skill_{i}" for i in range(n_skills)]
+    n_edges = min(n_edges, n_skills * (n_skills - 1) // 2)
+    pairs = set()
+    while len(pairs) < n_edges:
+        a, b = (int(rng.paretovariate(0.6)) - 1) % n_skills, rng.randrange(n_skills)
+        if a != b:
+            pairs.add((min(a, b), max(a, b)))
+    return [{"pair": [skills[a], skills[b]], "count": rng.randint(1, 300)} for a, b in sorted(pairs)]
+
+
+def job_skills_records(n_jobs=5_000, n_skills=60, n_months=18, skills_per_job=8, seed=0):
+    """
+    rows like /job_skills: one per (job_id, skill), with the job's month and the category,
+    country and seniority values the api paths use. skills are skewed like the pairs above
+    """
+    rng = random.Random(seed)
+    skills = [f"skill_{i}" for i in range(n_skills)]
+    job_months = months(n_months)
+    seniorities = ["intern", "entry", "mid", "senior"]
+    records = []
+    for job in range(n_jobs):
+        job_row = {
+            "job_id": f"job_{job}",
+            "year_month": rng.choice(job_months),
+            "job_category": rng.choice(JOB_CATEGORIES),
+            "country": rng.choice(COUNTRIES),
+            "binned_seniority": rng.choice(seniorities),
+        }
+        picked = {(int(rng.paretovariate(0.6)) - 1) % n_skills for _ in range(rng.randint(1, 2 * skills_per_job))}
+        records.extend({**job_row, "skill": skills[i]} for i in sorted(picked))
+    return records
@@ -0,0 +1,96 @@
+"""
+per-endpoint circuit breakers for api_client.
+
+after FAILURE_THRESHOLD consecutive failures an endpoint's breaker opens and requests to it
+fail immediately for RESET_TIMEOUT seconds instead of piling up behind timeouts and
+retries. the first request after that is let through as a trial (half-open): success
+closes the breaker, failure opens it for another RESET_TIMEOUT.
+"""
+import os
+import threading
+import time
+
+FAILURE_THRESHOLD = int(os.environ.get("API_BREAKER_FAILURES", 3))
+RESET_TIMEOUT = float(os.environ.get("API_BREAKER_RESET_SECONDS", 30))
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_in):
+        super().__init__(f"circuit open for {name}, retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def retry_in(self, now=None):
+        """
+        seconds until a trial request is let through; 0 when closed or due for a trial
+        """
+        if self.opened_at is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(self.opened_at + self.reset_timeout - now, 0.0)
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._trial or self.retry_in() == 0 else "open"
+
+    def before_call(self):
+        """
+        raises CircuitOpen unless a request may go out now
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            retry_in = self.retry_in()
+            # only one trial at a time; everyone else keeps failing fast until it's back
+            if retry_in > 0 or self._trial:
+                raise CircuitOpen(self.name, retry_in)
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+def breaker(name):
+    """
+    the process-wide breaker for name, created closed on first use
+    """
+    cb = _breakers.get(name)
+    if cb is None:
+        with _breakers_lock:
+            cb = _breakers.setdefault(name, CircuitBreaker(name))
+    return cb
+
+
+def open_circuits():
+    """
+    {name: seconds until retry} for every breaker that isn't closed
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {cb.name: cb.retry_in() for cb in breakers if cb.state != "closed"}
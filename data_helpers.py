@@ -0,0 +1,505 @@
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import MappingProxyType
+from typing import NamedTuple
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import api_client
+import perf
+from graph_helpers import backbone_pairs
+from lazy_imports import lazy_module
+from skill_incidence import SkillIncidence
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+requests = lazy_module("requests")
+
+
+# one worker per endpoint the page needs, so a cold load costs roughly the slowest call
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 5))
+
+# getters take a data_version argument (api_client.cache_version()) purely as part of the cache
+# key, so in-memory entries roll over at the nightly refresh and again once background refreshes
+# replace stale data; the ttl just drops entries from previous versions
+MEMORY_CACHE_TTL = timedelta(days=1)
+
+# fetch every sidebar combination of skill proportions once per data version and slice locally
+SKILL_PROPORTIONS_BULK = os.environ.get("SKILL_PROPORTIONS_BULK", "1") != "0"
+
+# st.cache_data pickles a getter's frame and unpickles a fresh copy on every call. with this
+# on, frame getters keep one frame per process in st.cache_resource and hand out views of it
+SHARED_FRAME_CACHE = os.environ.get("SHARED_FRAME_CACHE", "1") != "0"
+
+# skill network backbone (graph_helpers.backbone_pairs): every skill keeps its NETWORK_TOP_K
+# strongest edges plus any edge the disparity filter finds significant at NETWORK_ALPHA, and
+# at most NETWORK_MAX_EDGES edges are kept overall. 0 turns a stage off
+NETWORK_TOP_K = int(os.environ.get("NETWORK_TOP_K", 10)) or None
+NETWORK_ALPHA = float(os.environ.get("NETWORK_ALPHA", 0.05)) or None
+NETWORK_MAX_EDGES = int(os.environ.get("NETWORK_MAX_EDGES", 500)) or None
+
+# job categories listed per region in the statistics section; at least the largest one
+TOP_CATEGORIES_N = max(int(os.environ.get("TOP_CATEGORIES_N", 10)), 1)
+
+# per-job skills for counting co-occurrence locally over any date range (skill_incidence).
+# off until the api serves the endpoint; servers without it answer 404 and the network
+# graph keeps its default range
+JOB_SKILLS_PATH = "/job_skills"
+LOCAL_COOCCURRENCE = os.environ.get("LOCAL_COOCCURRENCE", "0") == "1"
+
+# label columns compact_frame stores as categoricals
+CATEGORICAL_COLUMNS = ('job_category', 'country', 'binned_seniority', 'skill')
+# columns identifying one monthly series in /salary_stats and /seniority_stats
+SERIES_COLUMNS = ('job_category', 'country', 'binned_seniority')
+# the smoothing window the page starts with, in months
+DEFAULT_SMOOTHING_WINDOW = 3
+
+JOB_TITLES = ['Machine Learning Engineer', 'Software Engineer', 'Data Engineer', 'Data Scientist', 'Data Analyst']
+SENIORITY_MAPPING = {
+    "Intern": "intern",
+    "Entry": "entry",
+    "Mid": "mid",
+    "Senior": "senior"
+}
+AVAILABLE_COUNTRIES = ['All', 'US', 'Canada']
+# region selectbox label -> country value in /summary_stats
+REGIONS = {"Overall": "overall", "Canada": "canada", "United States": "us"}
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+# the skill proportions cube is built on its own thread, so a prefetch worker never waits
+# on its ~60 requests (or on another session's build of it)
+_cube_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="skill-cube-build")
+_cube_builds = {}  # (threshold, data_version) -> future of get_skill_proportions_cube
+_cube_builds_lock = threading.Lock()
+
+
+def _category_slug(job_category):
+    return job_category.lower().replace(' ', '_') if job_category else job_category
+
+
+def compact_frame(df):
+    """
+    label columns become categoricals, year_month datetimes, and numbers are downcast
+    to the smallest dtype that holds them
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif column == 'year_month':
+            df[column] = pd.to_datetime(df[column])
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast='float')
+    return df
+
+def _copy_on_write():
+    return int(pd.__version__.split('.')[0]) >= 3 or pd.get_option('mode.copy_on_write') is True
+
+def read_only_view(df):
+    """
+    a copy of a shared frame that can't modify it. under copy-on-write (always on from
+    pandas 3) a shallow copy is enough; otherwise this falls back to a deep copy
+    """
+    return df.copy(deep=not _copy_on_write())
+
+def frame_cache(fn):
+    """
+    caches a getter that returns a dataframe, compacting it first. with SHARED_FRAME_CACHE
+    one copy is kept per process and each call gets a read_only_view of it
+    """
+    @functools.wraps(fn)
+    def compacted(*args, **kwargs):
+        return compact_frame(fn(*args, **kwargs))
+
+    if not SHARED_FRAME_CACHE:
+        return st.cache_data(ttl=MEMORY_CACHE_TTL)(compacted)
+
+    cached = st.cache_resource(ttl=MEMORY_CACHE_TTL)(compacted)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return read_only_view(cached(*args, **kwargs))
+
+    wrapper.clear = cached.clear
+    return wrapper
+
+
+@st.cache_data(ttl=MEMORY_CACHE_TTL)
+def get_summary_stats_data(data_version=None):
+    perf.annotate(cache_hit=False)
+    return api_client.get_frame("/summary_stats")
+
+
+class CategoryMetrics(NamedTuple):
+    label: str
+    counts: int
+    median_mid_salary: float
+    mid_level_count: int
+
+
+class RegionMetrics(NamedTuple):
+    total_jobs: int
+    categories: tuple  # CategoryMetrics, largest first
+
+
+def _category_label(slug):
+    return slug.replace("_", " ").title().replace("Machine Learning", "ML")
+
+def build_region_index(summary_df):
+    """
+    turns summary stats into {country: RegionMetrics}, with categories labelled
+    for display and sorted by job count
+    """
+    index = {}
+    for country, group in summary_df.groupby('country', sort=False):
+        group = group.sort_values('counts', ascending=False, kind='stable')
+        mid_level_counts = group['mid_level_count'].tolist() if 'mid_level_count' in group else [0] * len(group)
+        categories = tuple(
+            CategoryMetrics(_category_label(slug), counts, salary, mid_level_count)
+            for slug, counts, salary, mid_level_count in zip(
+                group['job_category'].tolist(), group['counts'].tolist(),
+                group['median_mid_salary'].tolist(), mid_level_counts
+            )
+        )
+        index[country] = RegionMetrics(sum(category.counts for category in categories), categories)
+    return index
+
+@st.cache_resource(ttl=MEMORY_CACHE_TTL, max_entries=2)
+def get_region_index(data_version=None):
+    """
+    build_region_index over /summary_stats, computed once per data version and shared
+    read-only by every session
+    """
+    perf.annotate(cache_hit=False)
+    return MappingProxyType(build_region_index(get_summary_stats_data(data_version=data_version)))
+
+def _series_ids(df, keys):
+    # one integer per distinct combination of keys, without a groupby
+    if not keys:
+        return np.zeros(len(df), dtype=np.int64)
+    codes = [pd.factorize(df[key], use_na_sentinel=False)[0] for key in keys]
+    return np.ravel_multi_index(codes, [c.max() + 1 for c in codes])
+
+def rolling_series(df, window, how="median", value="smoothed_value"):
+    """
+    rolling `how` ('median' or 'mean') of value over the last `window` months of each
+    series (the SERIES_COLUMNS in df), with early months using the months available.
+    every series is smoothed at once: rows are sorted into series order and each row's
+    window is gathered into one (rows, window) matrix that is reduced along its rows
+    """
+    if how not in ("median", "mean"):
+        raise ValueError(f"how must be 'median' or 'mean', not {how!r}")
+    if window <= 1 or df.empty:
+        return df
+
+    series = _series_ids(df, [column for column in SERIES_COLUMNS if column in df.columns])
+    # iso dates and datetimes both factorize in month order
+    months = pd.factorize(df['year_month'], sort=True)[0]
+    order = np.lexsort((months, series))
+    series = series[order]
+    values = df[value].to_numpy(dtype=float)[order]
+
+    rows = np.arange(len(order))
+    first_row = np.searchsorted(series, series, side='left')
+    lagged = rows[:, None] - np.arange(window)
+    windows = np.where(lagged >= first_row[:, None], values[np.maximum(lagged, 0)], np.nan)
+    counts = np.count_nonzero(~np.isnan(windows), axis=1)
+    if how == "mean":
+        reduced = np.nansum(windows, axis=1) / np.where(counts, counts, np.nan)
+    else:
+        # missing values sort last, so the middle of each row's present values is at (counts - 1) // 2 and counts // 2
+        windows.sort(axis=1)
+        low = np.take_along_axis(windows, np.maximum(counts - 1, 0)[:, None] // 2, axis=1)[:, 0]
+        high = np.take_along_axis(windows, (counts // 2)[:, None], axis=1)[:, 0]
+        reduced = np.where(counts, (low + high) / 2, np.nan)
+
+    smoothed = np.empty(len(order))
+    smoothed[order] = reduced
+    out = df.copy(deep=False)
+    out[value] = smoothed
+    return out
+
+@frame_cache
+def get_salary_stats_monthly(by="median", keep_predicted_jobs = True, data_version=None):
+    """
+    calls the fastapi endpoint /salary_stats for the unsmoothed monthly `by` of salaries
+    returns a dataframe
+    """
+    perf.annotate(cache_hit=False)
+    params = {
+        "by": by,
+        "smoothing_window": 1,
+        "keep_predicted_jobs": keep_predicted_jobs
+    }
+    return api_client.get_time_series("/salary_stats", params=params)
+
+@frame_cache
+def get_seniority_stats_monthly(keep_predicted_jobs = True, data_version=None):
+    """
+    calls the fastapi endpoint /seniority_stats for the unsmoothed monthly shares
+    returns a dataframe
+    """
+    perf.annotate(cache_hit=False)
+    params = {"smoothing_window": 1,
+               "keep_predicted_jobs": keep_predicted_jobs
+               }
+    return api_client.get_time_series("/seniority_stats", params=params)
+
+def get_salary_stats_data(by="median", smoothing_window=DEFAULT_SMOOTHING_WINDOW, keep_predicted_jobs = True, data_version=None,
+                          rolling="median"):
+    """
+    rolling `rolling` ('median' or 'mean') over smoothing_window months of the monthly `by`
+    of salaries, computed locally so every window shares one request and cache entry.
+    `by` is any statistic /salary_stats supports
+    """
+    monthly = get_salary_stats_monthly(by=by, keep_predicted_jobs=keep_predicted_jobs, data_version=data_version)
+    return rolling_series(monthly, smoothing_window, how=rolling)
+
+def get_seniority_stats_data(smoothing_window=DEFAULT_SMOOTHING_WINDOW, keep_predicted_jobs = True, data_version=None):
+    """
+    rolling median over smoothing_window months of the monthly seniority shares
+    """
+    monthly = get_seniority_stats_monthly(keep_predicted_jobs=keep_predicted_jobs, data_version=data_version)
+    return rolling_series(monthly, smoothing_window)
+
+@frame_cache
+def get_skill_proportions_data(job_category=None, threshold=10, seniority=None, country = None, data_version=None):
+    perf.annotate(cache_hit=False)
+    params = {"threshold": threshold,
+             }
+    job_category = _category_slug(job_category)
+    return api_client.get_time_series(f"/skill_proportions/by_category/{job_category}/{country}/{seniority}", params=params)
+
+@st.cache_resource(ttl=MEMORY_CACHE_TTL, max_entries=2)
+def get_skill_proportions_cube(threshold=10, data_version=None):
+    """
+    fetches skill proportions for every (category, country, seniority) the sidebar offers
+    and stacks them into one frame indexed by (category, country, seniority, year_month).
+    combinations whose request fails are left out and listed in attrs["missing"];
+    only if every one fails is the error raised. cached as a shared resource, so treat
+    the result as read-only and use slice_skill_proportions to get a single combination.
+    """
+    perf.annotate(cache_hit=False)
+    combos = [
+        (_category_slug(job_category), country.lower(), seniority)
+        for job_category in JOB_TITLES
+        for country in AVAILABLE_COUNTRIES
+        for seniority in SENIORITY_MAPPING.values()
+    ]
+
+    def fetch(combo):
+        job_category, country, seniority = combo
+        return api_client.get_time_series(
+            f"/skill_proportions/by_category/{job_category}/{country}/{seniority}",
+            params={"threshold": threshold}
+        )
+
+    # a separate pool from the build thread, so the combinations are fetched concurrently
+    with ThreadPoolExecutor(max_workers=api_client.POOL_SIZE, thread_name_prefix="skill-cube") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fetch, combo) for combo in combos]
+        fetched, missing = {}, []
+        for combo, future in zip(combos, futures):
+            try:
+                fetched[combo] = future.result()
+            except (requests.HTTPError, api_client.ApiUnavailable) as e:
+                # e.g. a 404 for one combination, or its route's circuit being open
+                missing.append(combo)
+                error = e
+    if not fetched:
+        raise error
+    perf.annotate(missing=len(missing))
+
+    cube = pd.concat(list(fetched.values()), keys=list(fetched), names=['category', 'country', 'seniority'])
+    # compacted after stacking, since concatenating categoricals with different categories gives objects
+    cube = compact_frame(cube)
+    if not cube.empty:
+        cube = cube.droplevel(-1).set_index('year_month', append=True).sort_index()
+    cube.attrs["missing"] = frozenset(missing)
+    return cube
+
+def slice_skill_proportions(cube, job_category, seniority, country):
+    """
+    returns the same frame get_skill_proportions_data would for one sidebar selection,
+    or None if the cube couldn't fetch that combination
+    """
+    combo = (_category_slug(job_category), country, seniority)
+    if combo in cube.attrs.get("missing", ()):
+        return None
+    try:
+        return cube.loc[combo].reset_index()
+    except KeyError:
+        return pd.DataFrame(columns=['year_month'] + cube.columns.tolist())
+
+def _skill_proportions_cube_future(threshold=10, data_version=None):
+    """
+    the build of get_skill_proportions_cube on _cube_executor, started by the first caller
+    for a (threshold, data_version) and shared with the rest. a failed build is retried
+    by the next caller
+    """
+    key = (threshold, data_version)
+    with _cube_builds_lock:
+        future = _cube_builds.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            # builds for earlier data versions won't be asked for again
+            for other in [other for other in _cube_builds if other[1] != data_version]:
+                del _cube_builds[other]
+            future = _cube_builds[key] = _submit_on(
+                _cube_executor, get_skill_proportions_cube, threshold=threshold, data_version=data_version
+            )
+    return future
+
+def _get_skill_proportions_slice(job_category, seniority, country, threshold=10, data_version=None):
+    """
+    one selection sliced from the cube once it's built; until then, or for a combination
+    the cube couldn't fetch, the selection is requested on its own
+    """
+    future = _skill_proportions_cube_future(threshold=threshold, data_version=data_version)
+    sliced = None
+    if future.done() and future.exception() is None:
+        sliced = slice_skill_proportions(future.result(), job_category, seniority, country)
+    perf.annotate(from_cube=sliced is not None)
+    if sliced is None:
+        return get_skill_proportions_data(
+            job_category=job_category, threshold=threshold, seniority=seniority, country=country, data_version=data_version
+        )
+    return sliced
+
+@st.cache_data(ttl=MEMORY_CACHE_TTL)
+def get_skill_frequencies_data(job_category=None, proportion_threshold=0.01, min_edge_frequency=20, seniority=None, country = None,
+                               top_k=None, alpha=None, max_edges=None, data_version=None):
+    """
+    calls /skill_frequencies and prunes the pairs with backbone_pairs(top_k, alpha, max_edges)
+    """
+    perf.annotate(cache_hit=False)
+    params = {
+        # "proportion_threshold": proportion_threshold,
+        # "min_edge_frequency": min_edge_frequency
+    }
+    job_category = _category_slug(job_category)
+    pairs = api_client.get_json(f"/skill_frequencies/by_category/{job_category}/{country}/{seniority}", params=params)
+    kept = backbone_pairs(pairs, top_k=top_k, alpha=alpha, max_edges=max_edges)
+    perf.annotate(edges=len(pairs), edges_kept=len(kept))
+    return kept
+
+
+@st.cache_resource(ttl=MEMORY_CACHE_TTL, max_entries=2)
+def get_skill_incidence(data_version=None):
+    """
+    the SkillIncidence over /job_skills, built once per data version and shared read-only
+    by every session, or None if the api doesn't serve per-job skills
+    """
+    perf.annotate(cache_hit=False)
+    try:
+        rows = api_client.get_time_series(JOB_SKILLS_PATH)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        raise
+    with perf.span("build:skill_incidence", rows=len(rows)):
+        return SkillIncidence.from_frame(rows)
+
+def get_local_skill_frequencies(incidence, start_date, end_date, job_category=None, seniority=None, country=None,
+                                proportion_threshold=0.01, top_k=None, alpha=None, max_edges=None):
+    """
+    get_skill_frequencies_data for the jobs posted from start_date's month to end_date's,
+    counted from a SkillIncidence instead of requested from /skill_frequencies
+    """
+    pairs = incidence.pairs(
+        start_date, end_date, job_category=_category_slug(job_category), country=country, seniority=seniority,
+        proportion_threshold=proportion_threshold
+    )
+    kept = backbone_pairs(pairs, top_k=top_k, alpha=alpha, max_edges=max_edges)
+    perf.annotate(edges=len(pairs), edges_kept=len(kept))
+    return kept
+
+
+def dashboard_requests():
+    """
+    (path, params) for every api request the dashboard can make, with the params the
+    getters above send
+    """
+    yield "/summary_stats", {}
+    for keep_predicted_jobs in (False, True):
+        yield "/seniority_stats", {"smoothing_window": 1, "keep_predicted_jobs": keep_predicted_jobs}
+        yield "/salary_stats", {"by": "median", "smoothing_window": 1, "keep_predicted_jobs": keep_predicted_jobs}
+    for job_category in JOB_TITLES:
+        for country in AVAILABLE_COUNTRIES:
+            for seniority in SENIORITY_MAPPING.values():
+                combo = f"{_category_slug(job_category)}/{country.lower()}/{seniority}"
+                yield f"/skill_proportions/by_category/{combo}", {"threshold": 10}
+                yield f"/skill_frequencies/by_category/{combo}", {}
+
+
+def _submit(fn, *args, **kwargs):
+    """
+    runs a (cached) getter on the prefetch pool, attaching the current script run context
+    so st.cache_data behaves the same as when called from the script thread
+    """
+    return _submit_on(_executor, fn, *args, **kwargs)
+
+
+def _submit_on(executor, fn, *args, **kwargs):
+    ctx = get_script_run_ctx()
+    # carries the perf run along so spans opened on the worker are recorded
+    perf_ctx = contextvars.copy_context()
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+        with perf.span(f"fetch:{fn.__name__}", cache_hit=True):
+            return fn(*args, **kwargs)
+
+    return executor.submit(perf_ctx.run, run)
+
+
+def prefetch_dashboard_data(job_category, seniority, country, keep_predicted_jobs=False):
+    """
+    issues every request the page needs at once and returns a dict of futures.
+    sections call .result() on their entry when they render, so the page waits
+    for the slowest endpoint instead of the sum of all of them.
+    """
+    data_version = api_client.cache_version()
+    get_skill_proportions = _get_skill_proportions_slice if SKILL_PROPORTIONS_BULK else get_skill_proportions_data
+    return {
+        "region_index": _submit(get_region_index, data_version=data_version),
+        # monthly series; the page smooths them with rolling_series for the window it shows
+        "seniority_stats": _submit(
+            get_seniority_stats_monthly,
+            keep_predicted_jobs=keep_predicted_jobs,
+            data_version=data_version
+        ),
+        "salary_stats": _submit(
+            get_salary_stats_monthly,
+            by="median",
+            keep_predicted_jobs=keep_predicted_jobs,
+            data_version=data_version
+        ),
+        "skill_proportions": _submit(
+            get_skill_proportions,
+            job_category=job_category,
+            seniority=seniority,
+            country=country,
+            threshold=10,
+            data_version=data_version
+        ),
+        "skill_frequencies": _submit(
+            get_skill_frequencies_data,
+            job_category=job_category,
+            seniority=seniority,
+            country=country,
+            proportion_threshold=0.01,
+            top_k=NETWORK_TOP_K,
+            alpha=NETWORK_ALPHA,
+            max_edges=NETWORK_MAX_EDGES,
+            data_version=data_version
+        ),
+        # never waited on; the network section offers a date range once it's done
+        "skill_incidence": _submit(get_skill_incidence, data_version=data_version) if LOCAL_COOCCURRENCE else None,
+    }
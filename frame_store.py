@@ -0,0 +1,85 @@
+"""
+the last full frame of each time-series endpoint, kept on disk so that a refresh after the
+nightly run only downloads the months that changed (see api_client.get_time_series).
+
+frames are arrow ipc files with a json sidecar recording the data version they reflect
+and when history was last downloaded in full.
+"""
+import importlib.util
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import http_cache
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")
+pa = lazy_module("pyarrow") if importlib.util.find_spec("pyarrow") is not None else None
+
+FRAME_STORE_DIR = os.environ.get("API_FRAME_DIR", os.path.join(os.path.dirname(http_cache.CACHE_DIR), "frames"))
+# set to 0 to download the full history on every refresh
+INCREMENTAL_REFRESH = pa is not None and os.environ.get("API_INCREMENTAL", "1") != "0"
+
+# the api returns only rows with year_month at or after this parameter
+SINCE_PARAM = "since"
+MONTH_COLUMN = "year_month"
+
+# deltas only cover the latest month, so history is downloaded in full this often to pick
+# up revisions to older months
+FULL_REFRESH_INTERVAL = timedelta(days=int(os.environ.get("API_FULL_REFRESH_DAYS", 7)))
+
+
+class StoredFrame:
+    def __init__(self, frame, data_version, full_at):
+        self.frame = frame
+        self.data_version = data_version
+        self.full_at = full_at
+
+    def needs_full_refresh(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        return self.frame.empty or now - datetime.fromisoformat(self.full_at) >= FULL_REFRESH_INTERVAL
+
+    def latest_month(self):
+        return pd.to_datetime(self.frame[MONTH_COLUMN]).max().strftime("%Y-%m-%d")
+
+
+def _paths(key):
+    return os.path.join(FRAME_STORE_DIR, f"{key}.json"), os.path.join(FRAME_STORE_DIR, f"{key}.arrow")
+
+
+def load(key):
+    meta_path, frame_path = _paths(key)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with pa.memory_map(frame_path, "r") as source:
+            frame = pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    except (OSError, ValueError, pa.ArrowInvalid):
+        return None
+    return StoredFrame(frame, **meta)
+
+
+def store(key, frame, data_version, full_at):
+    os.makedirs(FRAME_STORE_DIR, exist_ok=True)
+    meta_path, frame_path = _paths(key)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    # frame first so the metadata never describes a frame that isn't there
+    http_cache._atomic_write(frame_path, sink.getvalue().to_pybytes())
+    http_cache._atomic_write(meta_path, json.dumps({"data_version": data_version, "full_at": full_at}).encode())
+    return StoredFrame(frame, data_version, full_at)
+
+
+def merge_months(base, delta, since):
+    """
+    upserts a delta by month: base rows before `since` are kept and every month the delta
+    covers is replaced by its rows. returns (frame, is_full); a delta reaching back before
+    `since` means the api ignored the parameter and sent full history, which replaces base
+    """
+    since = pd.Timestamp(since)
+    if len(delta) and (pd.to_datetime(delta[MONTH_COLUMN]) < since).any():
+        return delta, True
+    kept = base[pd.to_datetime(base[MONTH_COLUMN]) < since]
+    return pd.concat([kept, delta], ignore_index=True), False
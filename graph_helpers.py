@@ -0,0 +1,68 @@
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+def _top_k_mask(ends, weights, k):
+    """
+    marks each edge that is among the k heaviest edges of either endpoint
+    """
+    n_edges = len(weights)
+    nodes = np.concatenate([ends[:, 0], ends[:, 1]])
+    edges = np.concatenate([np.arange(n_edges), np.arange(n_edges)])
+    # group incidences by node, heaviest first, ties in input order
+    order = np.lexsort((edges, -np.concatenate([weights, weights]), nodes))
+    sorted_nodes = nodes[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_nodes, sorted_nodes, side='left')
+    keep = np.zeros(n_edges, dtype=bool)
+    keep[edges[order[rank < k]]] = True
+    return keep
+
+
+def disparity_significance(ends, weights):
+    """
+    disparity filter (serrano, boguna & vespignani 2009): the probability of an edge
+    carrying this large a share of an endpoint's strength if that node's weight were spread
+    uniformly at random over its edges. returns the smaller of the two endpoints' values
+    """
+    n_nodes = ends.max() + 1
+    strength = np.bincount(ends.ravel(), weights=np.repeat(weights, 2), minlength=n_nodes)
+    degree = np.bincount(ends.ravel(), minlength=n_nodes)
+
+    def from_side(side):
+        node = ends[:, side]
+        share = np.divide(weights, strength[node], out=np.zeros(len(weights)), where=strength[node] > 0)
+        return (1 - share) ** (degree[node] - 1)
+
+    return np.minimum(from_side(0), from_side(1))
+
+
+def backbone_pairs(pairs, top_k=None, alpha=None, max_edges=None):
+    """
+    prunes a co-occurrence edge list ([{"pair": [a, b], "count": n}, ...]) to its backbone.
+
+    an edge survives if it is one of the top_k heaviest edges of either endpoint, or if the
+    disparity filter finds it significant at level alpha; with only one of the two set, that
+    one decides. max_edges then keeps the heaviest survivors. all three default to off.
+    returns the kept records in their original order
+    """
+    if not pairs or (top_k is None and alpha is None and max_edges is None):
+        return pairs
+
+    weights = np.array([item["count"] for item in pairs], dtype=float)
+    _, inverse = np.unique([item["pair"][:2] for item in pairs], return_inverse=True)
+    ends = inverse.reshape(-1, 2)
+
+    if top_k is None and alpha is None:
+        keep = np.ones(len(pairs), dtype=bool)
+    else:
+        keep = np.zeros(len(pairs), dtype=bool)
+        if top_k is not None:
+            keep |= _top_k_mask(ends, weights, top_k)
+        if alpha is not None:
+            keep |= disparity_significance(ends, weights) < alpha
+
+    kept = np.flatnonzero(keep)
+    if max_edges is not None and len(kept) > max_edges:
+        kept = np.sort(kept[np.argsort(-weights[kept], kind='stable')[:max_edges]])
+    return [pairs[i] for i in kept]
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, time, timedelta, timezone
+from urllib.parse import urlencode
+
+
+CACHE_DIR = os.environ.get("API_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "api"))
+
+# the nightly dagster run is done by this time (UTC); anything validated before the most
+# recent boundary is considered expired and gets revalidated against the API
+DATA_REFRESH_UTC = os.environ.get("DATA_REFRESH_UTC", "06:00")
+
+_stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale": 0}
+_stats_lock = threading.Lock()
+
+
+def last_refresh_boundary(now=None):
+    """
+    returns the most recent nightly refresh time at or before now (aware, UTC)
+    """
+    now = now or datetime.now(timezone.utc)
+    hour, minute = (int(part) for part in DATA_REFRESH_UTC.split(":"))
+    boundary = datetime.combine(now.date(), time(hour, minute), tzinfo=timezone.utc)
+    if boundary > now:
+        boundary -= timedelta(days=1)
+    return boundary
+
+
+def current_data_version(now=None):
+    """
+    identifies the nightly data release the app should be showing; used as a cache key
+    so in-memory caches roll over together with the disk cache
+    """
+    return last_refresh_boundary(now).strftime("%Y-%m-%dT%H:%M")
+
+
+def cache_key(url, params=None, accept=None):
+    raw = url
+    if params:
+        raw += "?" + urlencode(sorted(params.items()))
+    if accept:
+        # the same url can come back as json or arrow depending on what was negotiated
+        raw += f"|{accept}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class CacheEntry:
+    """
+    a response body on disk plus the validators needed to revalidate it
+    """
+
+    def __init__(self, key, content, content_type=None, etag=None, last_modified=None, fetched_at=None, validated_at=None):
+        self.key = key
+        self.content = content
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.validated_at = validated_at
+
+    def is_fresh(self, now=None):
+        return datetime.fromisoformat(self.validated_at) >= last_refresh_boundary(now)
+
+    def data_version(self):
+        """
+        the data version this entry was last confirmed current for
+        """
+        return current_data_version(datetime.fromisoformat(self.validated_at))
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def _meta(self):
+        return {
+            "content_type": self.content_type,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "validated_at": self.validated_at,
+        }
+
+
+def _paths(key):
+    return os.path.join(CACHE_DIR, f"{key}.json"), os.path.join(CACHE_DIR, f"{key}.body")
+
+
+def _atomic_write(path, data):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load(key):
+    meta_path, body_path = _paths(key)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            content = f.read()
+    except (OSError, ValueError):
+        return None
+    return CacheEntry(key, content, **meta)
+
+
+def store(key, response):
+    """
+    persists a 200 response and returns it as a CacheEntry
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    entry = CacheEntry(
+        key,
+        response.content,
+        content_type=response.headers.get("Content-Type"),
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        fetched_at=now,
+        validated_at=now,
+    )
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta_path, body_path = _paths(key)
+    # body first so a reader never sees metadata pointing at a missing body
+    _atomic_write(body_path, entry.content)
+    _atomic_write(meta_path, json.dumps(entry._meta()).encode())
+    return entry
+
+
+def mark_revalidated(entry):
+    """
+    records a 304 so the entry stays fresh until the next refresh boundary
+    """
+    entry.validated_at = datetime.now(timezone.utc).isoformat()
+    meta_path, _ = _paths(entry.key)
+    _atomic_write(meta_path, json.dumps(entry._meta()).encode())
+    return entry
+
+
+def record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -1,124 +1,90 @@
-from plot_helpers import *
-import requests
+from plot_helpers import create_salary_plot, create_seniority_plot
+from prerender import DEFAULT_EDGE_SCALING, heatmap_figure, load_figure, network_date_range, network_figure
+from data_helpers import (AVAILABLE_COUNTRIES, DEFAULT_SMOOTHING_WINDOW, JOB_TITLES, NETWORK_ALPHA, NETWORK_MAX_EDGES,
+                          NETWORK_TOP_K, REGIONS, SENIORITY_MAPPING, get_local_skill_frequencies,
+                          TOP_CATEGORIES_N, prefetch_dashboard_data, rolling_series)
+from http_cache import cache_stats, current_data_version
+from api_client import ApiUnavailable, stale_data_version
+from circuit_breaker import open_circuits
+import perf
 import streamlit as st
-import pandas as pd
+from lazy_imports import lazy_module
+pd = lazy_module("pandas")
 st.set_page_config(layout="wide")
+perf_run = perf.start_run()
 from stoc import stoc
-from datetime import datetime
+from datetime import date
 
 
-API_BASE_URL = "https://api.11232020.xyz"
+def plot_chart(name, fig, **kwargs):
+    with perf.span(f"emit:{name}"):
+        st.plotly_chart(fig, **kwargs)
 
-@st.cache_data
-def get_summary_stats_data():
-    r = requests.get(f"{API_BASE_URL}/summary_stats")
-    r.raise_for_status()
-    data = r.json()  # should be a list of records
-    return pd.DataFrame(data)
-
-@st.cache_data
-def get_salary_stats_data(by="median", smoothing_window=3, keep_predicted_jobs = True):
+def wait_for(name, future):
+    """
+    a prefetched getter's result, or None after a warning if the api couldn't provide it
+    """
+    with perf.span(f"wait:{name}"):
+        try:
+            return future.result()
+        except ApiUnavailable:
+            perf.annotate(unavailable=True)
+            st.warning("This data can't be loaded right now because the API is unavailable. Try again in a minute.")
+            return None
+
+def month_starts(first, last):
+    months = []
+    while first <= last:
+        months.append(first)
+        first = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return months
+
+def loaded_skill_incidence(future):
     """
-    calls the fastapi endpoint /salary_stats
-    returns a dataframe
+    the SkillIncidence once the prefetch has built one, without waiting for it; None while
+    it's loading, if it failed, or if the api has no per-job skills
     """
-    params = {
-        "by": by,
-        "smoothing_window": smoothing_window,
-        "keep_predicted_jobs": keep_predicted_jobs
-    }
-    r = requests.get(f"{API_BASE_URL}/salary_stats", params=params)
-    r.raise_for_status()
-    data = r.json()  # should be a list of records
-    return pd.DataFrame(data)
-
-@st.cache_data
-def get_seniority_stats_data(smoothing_window=3, keep_predicted_jobs = True):
+    if future is None or not future.done() or future.exception() is not None:
+        return None
+    return future.result()
+
+def prerendered_figure(name, **params):
     """
-    calls the fastapi endpoint /seniority_stats
-    returns a dataframe
+    the figure prerender.py built for this data version, or None to render it live
     """
-    params = {"smoothing_window": smoothing_window,
-               "keep_predicted_jobs": keep_predicted_jobs
-               }
-    r = requests.get(f"{API_BASE_URL}/seniority_stats", params=params)
-    r.raise_for_status()
-    data = r.json()
-    return pd.DataFrame(data)
-
-@st.cache_data
-def get_skill_proportions_data(job_category=None, threshold=10, seniority=None, country = None):
-    params = {"threshold": threshold,        
-             }
-    if job_category:
-        job_category = job_category.lower().replace(' ', '_')
-    r = requests.get(f"{API_BASE_URL}/skill_proportions/by_category/{job_category}/{country}/{seniority}", params=params)
-    r.raise_for_status()
-    data = r.json()
-    if isinstance(data, dict) and "results" in data:
-        data = data["results"]
-    return pd.DataFrame(data)
-
-@st.cache_data
-def get_skill_frequencies_data(job_category=None, proportion_threshold=0.01, min_edge_frequency=20, seniority=None, country = None):
-    params = {
-        # "proportion_threshold": proportion_threshold,
-        # "min_edge_frequency": min_edge_frequency
-    }
-    if job_category:
-        job_category = job_category.lower().replace(' ', '_')
-    r = requests.get(f"{API_BASE_URL}/skill_frequencies/by_category/{job_category}/{country}/{seniority}", params=params)
-    r.raise_for_status()
-    data = r.json()
-    if isinstance(data, dict) and "results" in data:
-        data = data["results"]
-    return data
-
-def display_top_metrics(summary_df):
+    with perf.span(f"load:{name}"):
+        fig = load_figure(current_data_version(), name, **params)
+        perf.annotate(cache_hit=fig is not None)
+    return fig
+
+def display_top_metrics(region_index, top_n=TOP_CATEGORIES_N):
     stats_to_show = st.selectbox(
         "Select a Region:", 
-        ["Overall", "Canada", "United States"],
+        list(REGIONS),
         index=0
     )
+    region = region_index.get(REGIONS[stats_to_show])
+    if region is None or not region.categories:
+        st.warning("No data for this region.")
+        return
+
+    top_categories = region.categories[:top_n]
+    top_category = top_categories[0]
 
     col1, col2, col3 = st.columns([3, 3, 3])
 
     with col1:
-        if stats_to_show == "Overall":
-            df_filtered = summary_df[summary_df['country'] == 'overall']
-        elif stats_to_show == "Canada":
-            df_filtered = summary_df[summary_df['country'] == 'canada']
-        elif stats_to_show == "United States":
-            df_filtered = summary_df[summary_df['country'] == 'us']
-
-        df_filtered['job_category'] = df_filtered['job_category'].apply(lambda x: x.replace("_", " ").title())
-        df_filtered['job_category'] = df_filtered['job_category'].str.replace('Machine Learning', 'ML')
-
-        total_jobs = df_filtered['counts'].sum()
-
-        df_filtered = df_filtered.sort_values("counts", ascending=False)
-
-        top_categories = df_filtered.head(10)
-
-        if len(top_categories) == 0:
-            st.warning("No data for this region.")
-            return
-
-        top_category = top_categories.iloc[0]
-        st.metric(label="Total Jobs", value=f"{total_jobs:,}")
+        st.metric(label="Total Jobs", value=f"{region.total_jobs:,}")
 
     with col2:
-        st.metric(label=f"Largest Category (n = {top_category['counts']:,})", value=f"{top_category['job_category']}")
+        st.metric(label=f"Largest Category (n = {top_category.counts:,})", value=top_category.label)
 
     with col3:
-        median_salary = top_category['median_mid_salary']
-        mid_level_count = top_category.get('mid_level_count', 0)
-        salary_text = f"${median_salary:,.0f}"
-        st.metric(label=f"Median Salary (USD; last 3 months, n = {mid_level_count:,})", value=salary_text)
+        st.metric(label=f"Median Salary (USD; last 3 months, n = {top_category.mid_level_count:,})", value=f"${top_category.median_mid_salary:,.0f}")
 
     # display additional categories
     for i in range(1, len(top_categories)):
-        cat = top_categories.iloc[i]
+        cat = top_categories[i]
         col1, col2, col3 = st.columns([3, 3, 3])
 
         with col2:
@@ -127,26 +93,150 @@ def display_top_metrics(summary_df):
                 suffix = "nd"
             if i == 2: 
                 suffix = "rd"
-            st.metric(label=f"{i+1}{suffix} Largest Category (n = {cat['counts']:,})", value=f"{cat['job_category']}")
+            st.metric(label=f"{i+1}{suffix} Largest Category (n = {cat.counts:,})", value=cat.label)
+
+        with col3:
+            st.metric(label=f"Median Mid-Level Salary (USD; last 3 months, n = {cat.mid_level_count:,})", value=f"${cat.median_mid_salary:,.0f}")
+
+# each section is a fragment: its own widgets (region, edge scaling) rerun only that section.
+# sidebar changes still rerun the page, but unaffected sections are served from the
+# data, figure and layout caches. below-the-fold sections only block on their data
+# once the page above them has been sent.
+@st.fragment
+@perf.fragment_run()
+def statistics_section(region_index_future):
+    region_index = wait_for("region_index", region_index_future)
+    if region_index is None:
+        return
+
+    display_top_metrics(region_index)
+
+@st.fragment
+@perf.fragment_run()
+def market_overview_section(toc, seniority_future, salary_future, keep_predicted_jobs):
+    # the futures hold monthly series, smoothed here, so a new window costs no request
+    smoothing_window = st.slider(
+        "Smoothing window (months)", min_value=1, max_value=12, value=DEFAULT_SMOOTHING_WINDOW,
+        help="Both charts show a rolling median over this many months"
+    )
 
+    toc.h3("Seniority Over Time")
+    st.markdown("""
+                The figure below depicts the the breakdown of seniority, for each job category between the US and Canada. The idea is to see the demand of particular seniority levels between jobs, and between countries.
+                """)
+
+    proportion_plot = prerendered_figure("seniority_plot", keep_predicted_jobs=keep_predicted_jobs, smoothing_window=smoothing_window)
+    if proportion_plot is None:
+        proportion_df = wait_for("seniority_stats", seniority_future)
+        if proportion_df is not None:
+            with perf.span("smooth:seniority_stats"):
+                proportion_df = rolling_series(proportion_df, smoothing_window)
+            with perf.span("build:seniority_plot"):
+                proportion_plot = create_seniority_plot(proportion_df)
+    if proportion_plot is not None:
+        plot_chart("seniority_plot", proportion_plot, use_container_width=False)
+
+    toc.h3("Salary (USD) Over Time")
+
+    st.markdown(f"""
+                These fields, specifically salary and seniority are parsed by a mix of OpenAI's API and regular expression. 
+                Job category is done primarily using regex with some machine learning as indicated in the methods above. Data presented is a rolling median (k = {smoothing_window}), of medians.
+                """)
+
+    fig = prerendered_figure("salary_plot", keep_predicted_jobs=keep_predicted_jobs, smoothing_window=smoothing_window)
+    if fig is None:
+        filtered_jobs = wait_for("salary_stats", salary_future)
+        if filtered_jobs is None:
+            return
+        with perf.span("smooth:salary_stats"):
+            filtered_jobs = rolling_series(filtered_jobs, smoothing_window, how="median")
+        with perf.span("build:salary_plot"):
+            fig = create_salary_plot(filtered_jobs)
+    plot_chart("salary_plot", fig, use_container_width=False)
+
+@st.fragment
+@perf.fragment_run()
+def skill_trends_section(combo, skill_proportions_future):
+    with st.container():
+        col1, col2 = st.columns([0.2, 1])
+
+        # with col1:
+            # threshold = st.slider("Skill Threshold (WIP)", 1, 50, 10)
+        # with col2: 
+
+        fig_heatmap = prerendered_figure("skill_heatmap", **combo)
+        if fig_heatmap is None:
+            with st.spinner("Loading skill trends..."):
+                df_skill_props = wait_for("skill_proportions", skill_proportions_future)
+            if df_skill_props is None:
+                return
+
+            with perf.span("build:skill_heatmap"):
+                fig_heatmap = heatmap_figure(df_skill_props)
+        plot_chart("skill_heatmap", fig_heatmap, use_container_width=True)
+
+@st.fragment
+@perf.fragment_run()
+def network_section(combo, skill_frequencies_future, skill_incidence_future):
+    with st.container():
+        col3, col4 = st.columns([1, 0.4])
+
+        with col4:
+            edge_scaling_factor = st.slider('Edge Scaling Factor', min_value=1.0, max_value=10.0, value=DEFAULT_EDGE_SCALING, step=0.5)
+            # st.markdown('Defaults to year to date.')
+            default_start_date, default_end_date = network_date_range()
+            start_date, end_date = default_start_date, default_end_date
+            # the range control only appears once there is a matrix to count from
+            incidence = loaded_skill_incidence(skill_incidence_future)
+            month_range = incidence.month_range() if incidence is not None else None
+            if month_range is not None:
+                # the matrix's months, widened to the default range so it stays selectable
+                first_month, last_month = (month.item() for month in month_range)
+                start_date, end_date = st.select_slider(
+                    'Posting months',
+                    options=month_starts(min(first_month, default_start_date), max(last_month, default_end_date)),
+                    value=(default_start_date, default_end_date), format_func=lambda month: month.strftime('%b %Y')
+                )
+            counted_locally = (start_date, end_date) != (default_start_date, default_end_date)
+            if not counted_locally:
+                st.markdown('Data used is since 2024-06-01.')
         with col3:
-            median_salary = cat['median_mid_salary']
-            mid_level_count = cat.get('mid_level_count', 0)
-            salary_text = f"${median_salary:,.0f}"
-            st.metric(label=f"Median Mid-Level Salary (USD; last 3 months, n = {mid_level_count:,})", value=salary_text)
+
+            with st.container():
+                # prop_thresh = st.slider("proportion threshold", 0.0, 0.1, 0.01, step=0.01)
+
+                # other ranges are counted from the job x skill matrix, without a request
+                skill_freq_data = None
+                if counted_locally:
+                    with perf.span("count:skill_frequencies"):
+                        skill_freq_data = get_local_skill_frequencies(
+                            incidence, start_date, end_date, **combo,
+                            top_k=NETWORK_TOP_K, alpha=NETWORK_ALPHA, max_edges=NETWORK_MAX_EDGES
+                        )
+
+                dates_for_title = f"{start_date} to {end_date}"
+                fig = None
+                if skill_freq_data is None:
+                    fig = prerendered_figure(
+                        "network_graph", **combo, edge_scaling_factor=edge_scaling_factor, dates_for_title=dates_for_title
+                    )
+                if fig is None and skill_freq_data is None:
+                    with st.spinner("Loading skill network..."):
+                        skill_freq_data = wait_for("skill_frequencies", skill_frequencies_future)
+                    if skill_freq_data is None:
+                        return
+
+                if fig is None:
+                    with perf.span("build:network_graph"):
+                        fig = network_figure(combo["job_category"], skill_freq_data, edge_scaling_factor, dates_for_title)
+
+                plot_chart("network_graph", fig, use_container_width=True)
 
 st.sidebar.title("Menu")
 st.sidebar.caption("""
                    These options are only for the **skills heatmap** and **network analysis**. 
                    """)
 
-job_titles = ['Machine Learning Engineer', 'Software Engineer', 'Data Engineer', 'Data Scientist', 'Data Analyst']
-SENIORITY_MAPPING = {
-    "Intern": "intern",
-    "Entry": "entry",
-    "Mid": "mid",
-    "Senior": "senior"
-}
 selected_display = st.sidebar.radio(
     "Select a seniority level",
     list(SENIORITY_MAPPING.keys()),  
@@ -159,20 +249,31 @@ selected_seniority = SENIORITY_MAPPING[selected_display]
 
 selected_job_category = st.sidebar.radio(
     "Select a pre-defined job title",
-    job_titles,
+    JOB_TITLES,
     index=2,
     horizontal=False
 )
 
-available_countries = ['All', 'US', 'Canada']
 selected_country = st.sidebar.radio("Countries",
-                                     available_countries,
+                                     AVAILABLE_COUNTRIES,
                                      horizontal=True).lower()
 
+# filter_job_categories = st.toggle("Exclude Predicted Job Titles (applies to both seniority and salary analyses)")
+filter_job_categories = False
+
+# kick off every request up front; each section waits only on its own future
+data_futures = prefetch_dashboard_data(
+    job_category=selected_job_category,
+    seniority=selected_seniority,
+    country=selected_country,
+    keep_predicted_jobs=filter_job_categories
+)
 
 toc = stoc()
 
 st.title("North American Tech Career Insights")
+# filled in at the end of the run, once every section has its data
+data_as_of = st.empty()
 
 st.markdown("""
                                     
@@ -190,9 +291,7 @@ toc.h2("Statistics")
 
 st.markdown("Counts for each job title is across all seniorities whereas the median salary is for ONLY mid-entry jobs.")
 
-summary_df = get_summary_stats_data()
-
-display_top_metrics(summary_df)
+statistics_section(data_futures["region_index"])
 
 toc.h2("Market Overview")
 st.markdown("""
@@ -200,28 +299,7 @@ st.markdown("""
    **None of the settings on the left affect this section other than excluding jobs with predicted titles.** 
 """)
 
-# filter_job_categories = st.toggle("Exclude Predicted Job Titles (applies to both seniority and salary analyses)")
-filter_job_categories = False
-
-toc.h3("Seniority Over Time")
-st.markdown("""
-            The figure below depicts the the breakdown of seniority, for each job category between the US and Canada. The idea is to see the demand of particular seniority levels between jobs, and between countries.
-            """)
-
-proportion_df = get_seniority_stats_data( smoothing_window=3, keep_predicted_jobs=filter_job_categories)
-proportion_plot = create_seniority_plot(proportion_df)
-st.plotly_chart(proportion_plot, use_container_width=False)
-
-toc.h3("Salary (USD) Over Time")
-
-st.markdown("""
-            These fields, specifically salary and seniority are parsed by a mix of OpenAI's API and regular expression. 
-            Job category is done primarily using regex with some machine learning as indicated in the methods above. Data presented is a rolling median (k = 3), of medians.
-            """)
-
-filtered_jobs = get_salary_stats_data(by="median", smoothing_window=3, keep_predicted_jobs=filter_job_categories)
-fig = create_salary_plot(filtered_jobs)
-st.plotly_chart(fig, use_container_width=False)
+market_overview_section(toc, data_futures["seniority_stats"], data_futures["salary_stats"], filter_job_categories)
 
 
 # available_seniority = list(jobs['binned_seniority'].cat.categories) # be careful this is a pd.Categorical object
@@ -240,36 +318,10 @@ st.markdown(
     This analysis identifies trends in skill demand across various job categories, countries, and seniority levels (the latter two TBD). 
     By normalizing skill occurrences as a percentage of total job postings per month, the heatmap highlights the most sought-after skills and their fluctuations over time.
 """)
-with st.container():
-    col1, col2 = st.columns([0.2, 1])
-
-    df_skill_props = get_skill_proportions_data(
-            job_category=selected_job_category, 
-            seniority = selected_seniority,
-            country = selected_country,
-            threshold=10
-    )
-
-    # with col1:
-        # threshold = st.slider("Skill Threshold (WIP)", 1, 50, 10)
-    # with col2: 
-
-    # don't need if using the csv
-    df_pivot = df_skill_props.pivot_table(
-        index=['year_month', 'job_category'],  # row identifiers
-        columns='skill',                       # each unique skill becomes a column
-        values='proportion',                   # values for cells 
-        fill_value=0                          
-    ).reset_index()
-
-    df_pivot = df_pivot.merge(
-        df_skill_props[['year_month', 'job_category', 'total_jobs']].drop_duplicates(),
-        on=['year_month', 'job_category'],
-        how='left'
-    )
+# the sidebar selection, as prerender.py keys the heatmap and network figures
+selected_combo = dict(job_category=selected_job_category, seniority=selected_seniority, country=selected_country)
 
-    fig_heatmap = create_skill_heatmap(df_pivot, height=700, width=800)
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+skill_trends_section(selected_combo, data_futures["skill_proportions"])
 
 toc.h2("Network Analysis of Co-occuring skills")
 
@@ -278,44 +330,10 @@ st.markdown("""
             This insight can help job seekers understand which skills are valuable to learn together and provide a clearer picture of industry demands.
 
             Edges between two nodes are only kept if two skills co-occur in at least 1% of jobs.
+            To keep the graph readable, each skill shows only its strongest connections plus any that are statistically significant for it.
             """)
 
-with st.container():
-    col3, col4 = st.columns([1, 0.4])
-
-    with col4:
-        edge_scaling_factor = st.slider('Edge Scaling Factor', min_value=1.0, max_value=10.0, value=3.0, step=0.5)
-        st.markdown('Data used is since 2024-06-01.')
-        # st.markdown('Defaults to year to date.')
-        current_date = datetime.today()
-        formatted_date_str = current_date.strftime('%Y-%m')
-        formatted_date = datetime.strptime(formatted_date_str, '%Y-%m').date()
-
-        default_start_date = datetime.strptime('2024-01-01', '%Y-%m-%d').date()
-        default_end_date = formatted_date
-        start_date = default_start_date
-        end_date = default_end_date
-        # start_date = st.date_input('Start date', value=default_start_date, min_value=datetime(2020, 1, 1).date())
-        # end_date = st.date_input('End date', value=default_end_date, max_value=formatted_date)
-    with col3:
-
-        with st.container():
-            # prop_thresh = st.slider("proportion threshold", 0.0, 0.1, 0.01, step=0.01)
-            
-            skill_freq_data = get_skill_frequencies_data(
-                job_category=selected_job_category, 
-                seniority = selected_seniority,
-                country = selected_country,
-                proportion_threshold=0.01, 
-                # min_edge_frequency=min_edge
-            )
-
-            fig = create_network_graph(
-                selected_job_category, skill_freq_data, layout_algo="Kamada-Kawai Layout", k=0,
-                edge_scaling_factor=edge_scaling_factor, dates_for_title=f"{start_date} to {end_date}"
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
+network_section(selected_combo, data_futures["skill_frequencies"], data_futures["skill_incidence"])
 
 st.markdown(
 """ 
@@ -334,7 +352,7 @@ Interpreting the Network Graph
 st.markdown("""
 TODO:
 - ~~add country filters to skill frequencies and proportions on back-end (db/api) and front-end~~
-- add date filter to skill frequencies
+- ~~add date filter to skill frequencies~~
 - facilitate analyses by user input title
             """)
 
@@ -368,4 +386,27 @@ The pipeline, which is containerized and hosted on an Oracle Cloud Infrastructur
             
 """, unsafe_allow_html=True)
 
+with st.sidebar.expander("Caches"):
+    stats = cache_stats()
+    st.caption(f"Data version: {current_data_version()} UTC")
+    st.caption(f"API hits: {stats['hits']:,} · Revalidated (304): {stats['revalidated']:,} · Misses: {stats['misses']:,} · Served stale: {stats['stale']:,}")
+    for endpoint, retry_in in open_circuits().items():
+        st.caption(f"API circuit open for {endpoint}, retrying in {retry_in:.0f}s")
+    for name, builder in [("Seniority figure", create_seniority_plot), ("Salary figure", create_salary_plot)]:
+        info = builder.cache_info()
+        st.caption(
+            f"{name}: {info['size']}/{info['maxsize']} entries ({info['bytes'] / 1024:,.0f} KiB), "
+            f"hit rate {info['hit_rate']:.0%} ({info['hits']:,} hits, {info['misses']:,} misses)"
+        )
+
 toc.toc()
+
+stale_version = stale_data_version()
+if stale_version is not None:
+    data_as_of.info(f"Data as of {stale_version} UTC. Newer data is being fetched in the background and will show on a later visit.")
+
+perf_spans = perf.finish_run(perf_run)
+if perf.PERF_ENABLED and st.sidebar.toggle("Performance", help="Timings for this rerun"):
+    with st.sidebar:
+        st.caption(f"{len(perf_spans)} spans, {sum(s['ms'] for s in perf_spans if s['name'].startswith('emit:')):,.0f} ms emitting charts")
+        st.dataframe(pd.DataFrame(perf_spans), hide_index=True)
@@ -0,0 +1,116 @@
+import time
+
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+
+# default wall-clock budget for the stress iterations, in seconds
+SPARSE_LAYOUT_TIME_BUDGET = 1.0
+
+
+def _select_pivots(A, n_pivots, rng):
+    """
+    max-min pivot selection: each new pivot is the node farthest from all chosen so far.
+    returns the pivot indices and their (n_pivots x n) distance rows
+    """
+    n = A.shape[0]
+    pivots = [int(rng.integers(n))]
+    rows = [dijkstra(A, directed=False, indices=pivots[0])]
+    nearest = rows[0].copy()
+    while len(pivots) < n_pivots:
+        candidate = int(np.argmax(nearest))
+        if nearest[candidate] == 0:
+            break
+        pivots.append(candidate)
+        rows.append(dijkstra(A, directed=False, indices=candidate))
+        nearest = np.minimum(nearest, rows[-1])
+    return np.array(pivots), np.vstack(rows)
+
+
+def _pivot_mds(D):
+    """
+    classical mds on the pivot distance matrix (pivot mds, brandes & pich 2006)
+    """
+    D2 = D.T ** 2  # n x k
+    C = -0.5 * (D2 - D2.mean(axis=0) - D2.mean(axis=1, keepdims=True) + D2.mean())
+    _, vectors = np.linalg.eigh(C.T @ C)
+    return C @ vectors[:, ::-1][:, :2]
+
+
+def sparse_stress_layout(G, weight='weight', n_pivots=50, max_iter=300, tol=1e-4, time_budget=SPARSE_LAYOUT_TIME_BUDGET, seed=0):
+    """
+    sparse stress majorization (ortmann, klimenta & brandes 2016).
+
+    distances come from dijkstra on a scipy csr adjacency, but only from n_pivots pivots,
+    so memory and per-iteration cost are O(edges + nodes * pivots) instead of the O(n^2)
+    of kamada-kawai. each node is attracted to its neighbours at their edge length and to
+    every pivot at its graph distance, weighted by how much of the pivot's region it stands in for.
+    like kamada_kawai_layout, the weight attribute is treated as edge length.
+    iterations stop at convergence or once time_budget seconds have passed.
+    returns {node: array([x, y])} rescaled to [-1, 1].
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format='csr').astype(float)
+
+    pivots, D = _select_pivots(A, min(n_pivots, n), rng)
+    # disconnected parts sit a little beyond the farthest reachable node
+    finite = D[np.isfinite(D)]
+    D[np.isinf(D)] = (finite.max() if finite.size else 1.0) * 1.2
+
+    X = _pivot_mds(D)
+    X += rng.normal(scale=1e-6, size=X.shape)  # break ties for coincident nodes
+
+    # edge terms in both directions
+    coo = A.tocoo()
+    offdiag = coo.row != coo.col
+    edge_i, edge_j, edge_d = coo.row[offdiag], coo.col[offdiag], coo.data[offdiag]
+
+    # pivot terms: a pivot stands in for the part of its region lying between it and the node,
+    # i.e. the members closer to the pivot than half the node's distance to it
+    region = np.argmin(D, axis=0)
+    pivot_i, pivot_j, pivot_d, pivot_s = [], [], [], []
+    for p, pivot in enumerate(pivots):
+        region_d = np.sort(D[p, region == p])
+        others = np.flatnonzero(np.arange(n) != pivot)
+        pivot_i.append(others)
+        pivot_j.append(np.full(len(others), pivot))
+        pivot_d.append(D[p, others])
+        pivot_s.append(np.maximum(np.searchsorted(region_d, D[p, others] / 2, side='right'), 1))
+    pivot_i, pivot_j, pivot_d, pivot_s = (np.concatenate(parts) for parts in (pivot_i, pivot_j, pivot_d, pivot_s))
+
+    I = np.concatenate([edge_i, pivot_i])
+    J = np.concatenate([edge_j, pivot_j])
+    d = np.concatenate([edge_d, pivot_d])
+    positive = d[d > 0]
+    d = np.where(d > 0, d, positive.min() if positive.size else 1.0)
+    w = np.concatenate([np.ones(len(edge_i)), pivot_s]) / d ** 2
+
+    denominator = np.bincount(I, weights=w, minlength=n)
+    movable = denominator > 0
+
+    for _ in range(max_iter):
+        diff = X[I] - X[J]
+        dist = np.maximum(np.hypot(diff[:, 0], diff[:, 1]), 1e-12)
+        target = X[J] + (d / dist)[:, None] * diff
+
+        X_new = X.copy()
+        X_new[movable, 0] = np.bincount(I, weights=w * target[:, 0], minlength=n)[movable] / denominator[movable]
+        X_new[movable, 1] = np.bincount(I, weights=w * target[:, 1], minlength=n)[movable] / denominator[movable]
+
+        change = np.abs(X_new - X).max() / max(np.abs(X_new).max(), 1e-12)
+        X = X_new
+        if change < tol or time.perf_counter() - start > time_budget:
+            break
+
+    X -= X.mean(axis=0)
+    X /= max(np.abs(X).max(), 1e-12)
+    return dict(zip(nodes, X))
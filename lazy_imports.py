@@ -0,0 +1,26 @@
+import importlib
+
+
+class LazyModule:
+    """
+    stands in for a module and imports it on first attribute access, so heavy
+    dependencies are only paid for by the code paths that use them.
+    importlib's own locking makes first use from several threads safe
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
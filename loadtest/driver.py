@@ -0,0 +1,100 @@
+"""
+simulates concurrent dashboard sessions against an api (normally the stub server)
+and reports page-render latency percentiles.
+
+    python -m loadtest.stub_server serve --latency 0.1 &
+    python -m loadtest.driver --api http://127.0.0.1:8800 --sessions 8 --rerenders 5
+
+each session renders jobs-app.py with streamlit's AppTest, then re-renders it after
+picking random sidebar options, the way a user clicks around. all sessions share one
+process and so share its caches, like sessions on one streamlit worker.
+in-memory caches start empty in each run; use --cold to also clear everything kept on
+disk: the http cache, stored time-series frames, snapshots and pre-rendered figures.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "jobs-app.py")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def run_session(seed, rerenders, timeout, latencies, errors):
+    from streamlit.testing.v1 import AppTest
+
+    from data_helpers import AVAILABLE_COUNTRIES, JOB_TITLES, SENIORITY_MAPPING
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    for i in range(rerenders + 1):
+        if i:
+            seniority, job_title, country = at.sidebar.radio[:3]
+            seniority.set_value(rng.choice(list(SENIORITY_MAPPING)))
+            job_title.set_value(rng.choice(JOB_TITLES))
+            country.set_value(rng.choice(AVAILABLE_COUNTRIES))
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        errors.extend(str(exception.value) for exception in at.exception)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api", default="http://127.0.0.1:8800", help="API_BASE_URL for the app")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--rerenders", type=int, default=5, help="sidebar changes per session after the first render")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--cold", action="store_true", help="start from empty caches, on disk too")
+    args = parser.parse_args()
+
+    # must be set before the app imports api_client
+    os.environ["API_BASE_URL"] = args.api
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    if args.cold:
+        import frame_store
+        import http_cache
+        import prerender
+        import snapshot
+        for directory in (http_cache.CACHE_DIR, frame_store.FRAME_STORE_DIR, snapshot.SNAPSHOT_DIR, prerender.FIGURES_DIR):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=run_session, args=(seed, args.rerenders, args.timeout, latencies, errors))
+        for seed in range(args.sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(latencies)} page renders from {args.sessions} sessions in {elapsed:.1f}s")
+    if latencies:
+        print(
+            f"p50 {percentile(latencies, 50) * 1e3:,.0f} ms  "
+            f"p90 {percentile(latencies, 90) * 1e3:,.0f} ms  "
+            f"p99 {percentile(latencies, 99) * 1e3:,.0f} ms  "
+            f"mean {statistics.mean(latencies) * 1e3:,.0f} ms  "
+            f"max {max(latencies) * 1e3:,.0f} ms"
+        )
+    if errors:
+        print(f"{len(errors)} errors, e.g. {errors[0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
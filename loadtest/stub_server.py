@@ -0,0 +1,271 @@
+"""
+a local stand-in for the dashboard api that replays recorded responses.
+
+    # record every response the dashboard asks for from the live api
+    python -m loadtest.stub_server record --source https://api.11232020.xyz
+
+    # or write synthetic fixtures when the api isn't reachable
+    python -m loadtest.stub_server synthesize
+
+    # serve them, with 150ms +/- 50ms of latency and 10x the rows
+    python -m loadtest.stub_server serve --port 8800 --latency 0.15 --jitter 0.05 --scale 10
+    API_BASE_URL=http://127.0.0.1:8800 streamlit run jobs-app.py
+
+fixtures are keyed by path only; query parameters are ignored when replaying, except
+`since`, which limits time series to rows with year_month at or after it.
+responses carry an ETag and honour If-None-Match, and are sent as an arrow stream
+when the client prefers it and pyarrow is installed.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import (job_skills_records, salary_stats_records, seniority_stats_records,
+                                  skill_frequencies_records, skill_proportions_records)
+from data_helpers import JOB_SKILLS_PATH, JOB_TITLES, _category_slug, dashboard_requests
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def _fixture_name(path):
+    return path.strip("/").replace("/", "__") + ".json"
+
+
+def _write_fixtures(fixtures_dir, payloads):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    index = {}
+    for path, payload in payloads:
+        name = _fixture_name(path)
+        with open(os.path.join(fixtures_dir, name), "w") as f:
+            json.dump(payload, f)
+        index[path] = name
+    with open(os.path.join(fixtures_dir, "index.json"), "w") as f:
+        json.dump(index, f, indent=1)
+    return len(index)
+
+
+def record(source, fixtures_dir):
+    session = requests.Session()
+
+    def payloads():
+        for path, params in dashboard_requests():
+            r = session.get(f"{source}{path}", params=params, headers={"Accept": "application/json"}, timeout=60)
+            r.raise_for_status()
+            yield path, r.json()
+
+    return _write_fixtures(fixtures_dir, payloads())
+
+
+def synthesize(fixtures_dir, n_months=18, n_skills=60, n_edges=500):
+    def payloads():
+        summary = [
+            {
+                "country": country,
+                "job_category": _category_slug(job_category),
+                "counts": random.Random(f"{country}{job_category}").randint(50, 2_000),
+                "median_mid_salary": random.Random(job_category).uniform(90_000, 180_000),
+                "mid_level_count": random.Random(f"{job_category}{country}").randint(5, 300),
+            }
+            for country in ("overall", "canada", "us")
+            for job_category in JOB_TITLES
+        ]
+        yield "/summary_stats", summary
+        yield "/seniority_stats", seniority_stats_records(n_months=n_months)
+        yield "/salary_stats", salary_stats_records(n_months=n_months)
+        for i, (path, _) in enumerate(dashboard_requests()):
+            if path.startswith("/skill_proportions/"):
+                job_category = path.split("/")[3]
+                yield path, {"results": skill_proportions_records(n_months, n_skills, job_category=job_category, seed=i)}
+            elif path.startswith("/skill_frequencies/"):
+                yield path, skill_frequencies_records(n_skills, n_edges, seed=i)
+        yield JOB_SKILLS_PATH, job_skills_records(n_skills=n_skills, n_months=n_months)
+
+    return _write_fixtures(fixtures_dir, payloads())
+
+
+def scale_payload(payload, factor):
+    """
+    grows a payload factor-fold while keeping its shape: time series get older months
+    prepended, co-occurrence lists get copies of the graph with renamed skills
+    """
+    if factor <= 1:
+        return payload
+    wrapped = isinstance(payload, dict) and "results" in payload
+    records = payload["results"] if wrapped else payload
+    if not records or not isinstance(records, list):
+        return payload
+
+    if "pair" in records[0]:
+        scaled = records + [
+            {"pair": [f"{a}_{k}" for a in item["pair"]], "count": item["count"]}
+            for k in range(1, factor)
+            for item in records
+        ]
+    elif "year_month" in records[0]:
+        months = sorted({record["year_month"] for record in records})
+        span = len(months)
+        scaled = []
+        for k in range(factor - 1, 0, -1):
+            for record in records:
+                shifted = pd.Timestamp(record["year_month"]) - pd.DateOffset(months=span * k)
+                scaled.append({**record, "year_month": shifted.strftime("%Y-%m-%d")})
+                if "job_id" in record:
+                    # earlier copies are different postings
+                    scaled[-1]["job_id"] = f"{record['job_id']}_{k}"
+        scaled += records
+    else:
+        return payload
+    return {**payload, "results": scaled} if wrapped else scaled
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # set on the class by serve()
+    bodies = {}
+    payloads = {}
+    latency = 0.0
+    jitter = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        url = urlsplit(self.path)
+        path = url.path
+        if path not in self.bodies:
+            self.send_error(404, f"no fixture for {path}")
+            return
+
+        wants_arrow = pa is not None and ARROW_STREAM in self.headers.get("Accept", "")
+        since = parse_qs(url.query).get("since")
+        bodies = self.bodies[path]
+        if since:
+            # deltas are rare enough to encode per request
+            bodies = _encode(since_payload(self.payloads[path], since[0]))
+        body, content_type, etag = bodies[ARROW_STREAM if wants_arrow else "json"]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def since_payload(payload, since):
+    """
+    keeps the time series rows with year_month >= since; other payloads are unchanged
+    """
+    wrapped = isinstance(payload, dict) and "results" in payload
+    records = payload["results"] if wrapped else payload
+    if not records or not isinstance(records, list) or "year_month" not in records[0]:
+        return payload
+    since = pd.Timestamp(since)
+    kept = [record for record in records if pd.Timestamp(record["year_month"]) >= since]
+    return {**payload, "results": kept} if wrapped else kept
+
+
+def _encode(payload):
+    body = json.dumps(payload).encode()
+    encoded = {"json": (body, "application/json", f'"{hashlib.sha1(body).hexdigest()}"')}
+
+    records = payload["results"] if isinstance(payload, dict) and "results" in payload else payload
+    tabular = pa is not None and isinstance(records, list) and records and "pair" not in records[0]
+    if tabular:
+        table = pa.Table.from_pandas(pd.DataFrame(records), preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue()
+        encoded[ARROW_STREAM] = (body, ARROW_STREAM, f'"{hashlib.sha1(body).hexdigest()}"')
+    else:
+        encoded[ARROW_STREAM] = encoded["json"]
+    return encoded
+
+
+def load_payloads(fixtures_dir, scale=1):
+    with open(os.path.join(fixtures_dir, "index.json")) as f:
+        index = json.load(f)
+    payloads = {}
+    for path, name in index.items():
+        with open(os.path.join(fixtures_dir, name)) as f:
+            payloads[path] = scale_payload(json.load(f), scale)
+    return payloads
+
+
+def load_bodies(payloads):
+    """
+    pre-encodes every fixture so serving costs no cpu
+    """
+    return {path: _encode(payload) for path, payload in payloads.items()}
+
+
+def serve(fixtures_dir, host="127.0.0.1", port=8800, latency=0.0, jitter=0.0, scale=1):
+    StubHandler.payloads = load_payloads(fixtures_dir, scale=scale)
+    StubHandler.bodies = load_bodies(StubHandler.payloads)
+    StubHandler.latency = latency
+    StubHandler.jitter = jitter
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    print(f"serving {len(StubHandler.bodies)} fixtures on http://{host}:{port} (latency {latency}s, scale {scale}x)")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="save live api responses as fixtures")
+    record_parser.add_argument("--source", default=os.environ.get("API_BASE_URL", "https://api.11232020.xyz"))
+
+    commands.add_parser("synthesize", help="write synthetic fixtures")
+
+    serve_parser = commands.add_parser("serve", help="replay fixtures over http")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8800)
+    serve_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve_parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency")
+    serve_parser.add_argument("--scale", type=int, default=1, help="multiply the rows in every payload")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        print(f"recorded {record(args.source, args.fixtures)} fixtures to {args.fixtures}")
+    elif args.command == "synthesize":
+        print(f"wrote {synthesize(args.fixtures)} fixtures to {args.fixtures}")
+    else:
+        server = serve(args.fixtures, args.host, args.port, args.latency, args.jitter, args.scale)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
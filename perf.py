@@ -0,0 +1,144 @@
+"""
+lightweight span timing for the dashboard's hot path.
+
+a script run calls start_run(), code inside it wraps work in `with span(name):`, and
+finish_run() hands back the spans and exports them. spans opened on other threads are
+recorded as long as the thread runs inside a copy of the script's context
+(contextvars.copy_context().run). with PERF_ENABLED unset, start_run() records nothing and
+span() returns a shared no-op context manager.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+PERF_ENABLED = os.environ.get("PERF_ENABLED", "0") == "1"
+# spans are appended here as json lines, one object per span
+PERF_LOG_PATH = os.environ.get("PERF_LOG_PATH")
+# a prometheus node-exporter textfile directory; each process writes its own file
+PERF_PROM_DIR = os.environ.get("PERF_PROM_DIR")
+
+_run = contextvars.ContextVar("perf_run", default=None)
+_span = contextvars.ContextVar("perf_span", default=None)
+
+_totals = {}
+_export_lock = threading.Lock()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, run, name, attrs):
+        self.run = run
+        self.record = {"name": name, **attrs}
+
+    def __enter__(self):
+        self.token = _span.set(self.record)
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _span.reset(self.token)
+        self.record["start_ms"] = round((self.start - self.run["start"]) * 1e3, 2)
+        self.record["ms"] = round((end - self.start) * 1e3, 2)
+        self.record["thread"] = threading.current_thread().name
+        self.run["spans"].append(self.record)
+        return False
+
+
+def span(name, **attrs):
+    run = _run.get()
+    if run is None:
+        return _NOOP
+    return _Span(run, name, attrs)
+
+
+def annotate(**attrs):
+    """
+    adds attributes (e.g. cache_hit=False) to the innermost open span, if any
+    """
+    record = _span.get()
+    if record is not None:
+        record.update(attrs)
+
+
+def start_run():
+    if not PERF_ENABLED:
+        return None
+    run = {"id": uuid.uuid4().hex[:12], "start": time.perf_counter(), "ts": time.time(), "spans": []}
+    _run.set(run)
+    return run
+
+
+@contextlib.contextmanager
+def fragment_run():
+    """
+    st.fragment reruns skip the script's start_run()/finish_run(), so a fragment body
+    wrapped in this gets its own run when nothing else is recording
+    """
+    if not PERF_ENABLED or _run.get() is not None:
+        yield
+        return
+    run = start_run()
+    try:
+        yield
+    finally:
+        finish_run(run)
+
+
+def finish_run(run):
+    """
+    exports the run's spans and returns them ordered by start time
+    """
+    _run.set(None)
+    if run is None:
+        return []
+    spans = sorted(run["spans"], key=lambda record: record["start_ms"])
+    if PERF_LOG_PATH:
+        _append_jsonl(run, spans)
+    if PERF_PROM_DIR:
+        _write_prom(spans)
+    return spans
+
+
+def _append_jsonl(run, spans):
+    lines = "".join(json.dumps({"run": run["id"], "ts": run["ts"], **record}) + "\n" for record in spans)
+    with _export_lock, open(PERF_LOG_PATH, "a") as f:
+        f.write(lines)
+
+
+def _write_prom(spans):
+    with _export_lock:
+        for record in spans:
+            key = (record["name"], str(record.get("cache_hit", "")).lower())
+            count, total = _totals.get(key, (0, 0.0))
+            _totals[key] = (count + 1, total + record["ms"] / 1e3)
+
+        lines = [
+            "# HELP jobs_app_span_seconds time spent in instrumented dashboard code",
+            "# TYPE jobs_app_span_seconds summary",
+        ]
+        for (name, cache_hit), (count, total) in sorted(_totals.items()):
+            labels = f'span="{name}",cache_hit="{cache_hit}"'
+            lines.append(f"jobs_app_span_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"jobs_app_span_seconds_count{{{labels}}} {count}")
+
+        os.makedirs(PERF_PROM_DIR, exist_ok=True)
+        path = os.path.join(PERF_PROM_DIR, f"jobs_app_{os.getpid()}.prom")
+        # the textfile collector must never see a half-written file
+        with open(f"{path}.tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(f"{path}.tmp", path)
@@ -1,17 +1,114 @@
-import networkx as nx
-import plotly.graph_objs as go
-import plotly.express as px
-import pandas as pd
-
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import perf
+from graph_helpers import backbone_pairs
+from lazy_imports import lazy_module
+
+# imported on first use; networkx and scipy only load once the network section renders
+nx = lazy_module("networkx")
+go = lazy_module("plotly.graph_objs")
+px = lazy_module("plotly.express")
+pio = lazy_module("plotly.io")
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+layout_helpers = lazy_module("layout_helpers")
+
+# px.colors.qualitative.Set1, inlined so importing this module doesn't load plotly.express
+SET1 = ['rgb(228,26,28)', 'rgb(55,126,184)', 'rgb(77,175,74)', 'rgb(152,78,163)', 'rgb(255,127,0)']
 COLOR_MAP = {
-    'Intern': px.colors.qualitative.Set1[3],      
-    'Entry Level': px.colors.qualitative.Set1[2], 
-    'Mid-Level': px.colors.qualitative.Set1[1],    
-    'Senior-Level': px.colors.qualitative.Set1[0],
-    'Leadership': px.colors.qualitative.Set1[4]
+    'Intern': SET1[3],      
+    'Entry Level': SET1[2], 
+    'Mid-Level': SET1[1],    
+    'Senior-Level': SET1[0],
+    'Leadership': SET1[4]
 }
 CATEGORY_ORDER = ['Intern', 'Entry Level', 'Mid-Level', 'Senior-Level', 'Leadership']
 
+# edges are drawn as one trace per width bucket, so the figure size doesn't grow with trace count
+EDGE_WIDTH_BUCKETS = 8
+# past this many edges the edge traces switch to webgl
+WEBGL_EDGE_THRESHOLD = 500
+
+# compact payloads send heatmap values and network coordinates as float32 typed arrays
+# (base64 in the figure json) instead of float64 or json number lists
+COMPACT_PAYLOADS = os.environ.get("COMPACT_PLOT_PAYLOADS", "1") != "0"
+# heatmap cell labels: two decimals up to this many cells, then whole percentages,
+# and none past HEATMAP_MAX_LABEL_CELLS (hover still shows the value)
+HEATMAP_FULL_LABEL_CELLS = 1_000
+HEATMAP_MAX_LABEL_CELLS = 2_500
+
+# node positions are shared across reruns and sessions; styling never invalidates them
+LAYOUT_CACHE_SIZE = 64
+_layout_cache = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+# serialized figures per builder, keyed by a content hash of the input frame and the arguments
+FIGURE_CACHE_SIZE = 32
+
+def frame_fingerprint(df):
+    h = hashlib.sha1()
+    h.update(repr((list(df.columns), [str(dtype) for dtype in df.dtypes])).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+def memoize_figure(maxsize=FIGURE_CACHE_SIZE):
+    """
+    caches a figure builder whose first argument is a dataframe. figures are stored as
+    plotly json and rehydrated on a hit, so callers can't corrupt the cached copy.
+    the wrapped function gains cache_info() and cache_clear()
+    """
+    def decorator(fn):
+        cache = OrderedDict()
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0}
+
+        @functools.wraps(fn)
+        def wrapper(df, *args, **kwargs):
+            key = (frame_fingerprint(df), args, tuple(sorted(kwargs.items())))
+            with lock:
+                serialized = cache.get(key)
+                if serialized is not None:
+                    cache.move_to_end(key)
+                    stats["hits"] += 1
+            perf.annotate(cache_hit=serialized is not None)
+            if serialized is not None:
+                return pio.from_json(serialized)
+
+            fig = fn(df, *args, **kwargs)
+            with lock:
+                stats["misses"] += 1
+                cache[key] = fig.to_json()
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return fig
+
+        def cache_info():
+            with lock:
+                lookups = stats["hits"] + stats["misses"]
+                return {
+                    **stats,
+                    "size": len(cache),
+                    "maxsize": maxsize,
+                    "bytes": sum(len(serialized) for serialized in cache.values()),
+                    "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+                }
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                stats.update(hits=0, misses=0)
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+@memoize_figure()
 def create_seniority_plot(jobs_per_month_by_seniority):
     
     selected_seniority = ['Senior-Level, us', 'Senior-Level, canada', 
@@ -94,6 +191,7 @@ def create_seniority_plot(jobs_per_month_by_seniority):
     return fig 
 
 
+@memoize_figure()
 def create_salary_plot(filtered_jobs):
 
     selected_seniority = ['Senior-Level, us', 'Senior-Level, canada', 
@@ -177,42 +275,72 @@ def create_salary_plot(filtered_jobs):
 
 
 
-def create_skill_heatmap(df, height = 600, width = 600):
-
-    tech_sums = df.drop(columns=['job_category', 'year_month', 'total_jobs']).sum().sort_values(ascending=False)
-
-    # tech_sums = df.drop(columns=['year_month', 'total_jobs']).sum().sort_values(ascending=False)
-    df = df[['year_month'] + tech_sums.index.tolist() + ['total_jobs']]
-
-    # treat time purely as string so plotly doesn't interpret it linearly, which widens some cells
-    # df['year_month'] = df['year_month'].astype(str)
-    df['year_month'] = pd.to_datetime(df['year_month']).dt.strftime('%B %Y')
-    # df['year_month'] = pd.to_datetime(df['year_month'].astype(str), format='%Y-%m')
-
-    total_jobs_per_month = df[['total_jobs', 'year_month']].drop_duplicates()
-    total_jobs_per_month.set_index('year_month', inplace=True)
-    df.set_index('year_month', inplace=True)
-
-    heatmap_data = df.drop(columns='total_jobs')
-
-
+class SkillMatrix(NamedTuple):
+    values: "np.ndarray"      # skills x months, proportion of jobs
+    skills: list            # row labels, most demanded first
+    months: list            # column labels, chronological, e.g. "June 2024"
+    total_jobs: "np.ndarray"  # jobs per month
+
+def build_skill_matrix(df, top_n=None):
+    """
+    turns the long skill_proportions frame (year_month, skill, proportion, total_jobs)
+    into a dense skills x months matrix in one pass. duplicate cells are averaged like
+    pivot_table did, skills are ordered by total proportion and optionally cut to top_n
+    """
+    month_codes, month_keys = pd.factorize(df['year_month'], sort=True)
+    skill_codes, skill_keys = pd.factorize(df['skill'])
+
+    shape = (len(skill_keys), len(month_keys))
+    sums = np.zeros(shape)
+    counts = np.zeros(shape)
+    np.add.at(sums, (skill_codes, month_codes), df['proportion'].to_numpy(dtype=float))
+    np.add.at(counts, (skill_codes, month_codes), 1)
+    values = np.divide(sums, counts, out=np.zeros(shape), where=counts > 0)
+
+    order = np.argsort(-values.sum(axis=1), kind='stable')
+    if top_n is not None:
+        order = order[:top_n]
+
+    total_jobs = np.zeros(len(month_keys), dtype=int)
+    total_jobs[month_codes] = df['total_jobs'].to_numpy()
+
+    # only the unique months get parsed and reformatted
+    months = pd.to_datetime(month_keys).strftime('%B %Y').tolist()
+    return SkillMatrix(values[order], skill_keys[order].tolist(), months, total_jobs)
+
+def heatmap_label_format(n_cells):
+    """
+    the cell label texttemplate for a heatmap of n_cells, or None for no labels
+    """
+    if n_cells <= HEATMAP_FULL_LABEL_CELLS:
+        return '.2f'
+    if n_cells <= HEATMAP_MAX_LABEL_CELLS:
+        return '.0%'
+    return None
+
+def create_skill_heatmap(skill_matrix, height = 600, width = 600, compact=COMPACT_PAYLOADS):
+
+    values = skill_matrix.values.astype(np.float32) if compact else skill_matrix.values
+    label_format = heatmap_label_format(values.size)
+
+    # months are passed as category labels so plotly doesn't interpret time linearly, which widens some cells
     fig = px.imshow(
-        heatmap_data.T,                                                      # transpose the data so technologies are on the y-axis
+        values,                                                              # technologies on the y-axis
         labels=dict(x="Year-Month", y="Technology", color="Proportion"),
-        y=heatmap_data.columns,                                              # technologies
-        x=heatmap_data.index,                                                # year-Month
+        y=skill_matrix.skills,                                               # technologies
+        x=skill_matrix.months,                                               # year-Month
         aspect="auto",
-        text_auto=True,
+        text_auto=label_format or False,
         color_continuous_scale='Inferno_r',
     )
 
     # total jobs data on the secondary x-axis
     fig.add_trace(
         go.Scatter(
-            x=total_jobs_per_month.index,
+            x=skill_matrix.months,
             # y = 0,
-            y=[0] * len(total_jobs_per_month),  # adjust this value to position above the heatmap
-            text=total_jobs_per_month['total_jobs'],
+            y=[0] * len(skill_matrix.months),  # adjust this value to position above the heatmap
+            text=skill_matrix.total_jobs,
             mode="text",
             showlegend=False,
             xaxis="x2"
@@ -225,9 +353,9 @@ def create_skill_heatmap(df, height = 600, width = 600):
         width = width,
         yaxis=dict(
             tickmode='linear',  
-            tickvals=list(range(len(heatmap_data.columns))),
-            ticktext=heatmap_data.columns.tolist(),
-            nticks=len(heatmap_data.columns),  
+            tickvals=list(range(len(skill_matrix.skills))),
+            ticktext=skill_matrix.skills,
+            nticks=len(skill_matrix.skills),  
             showticklabels=True, 
         ),
         xaxis=dict(
@@ -241,8 +369,8 @@ def create_skill_heatmap(df, height = 600, width = 600):
             side="bottom",
             showticklabels=False,
             tickmode='array',
-            tickvals=[i for i in range(len(total_jobs_per_month.index))],
-            ticktext=total_jobs_per_month.index.tolist()
+            tickvals=[i for i in range(len(skill_matrix.months))],
+            ticktext=skill_matrix.months
         ),
     )
 
@@ -250,7 +378,100 @@ def create_skill_heatmap(df, height = 600, width = 600):
 
     return fig 
 
-def create_network_graph(category, filtered_pairs, dates_for_title, layout_algo, k=20, edge_scaling_factor=0.1, normalize=True, height=600):
+def graph_fingerprint(G):
+    """
+    hashes node order, edges and weights; the same data (category, seniority, country
+    and data version) always produces the same graph, so this stands in for all of them
+    """
+    h = hashlib.sha1()
+    h.update(repr(list(G.nodes())).encode())
+    h.update(repr(list(G.edges(data='weight'))).encode())
+    return h.hexdigest()
+
+def _run_layout(G, layout_algo, k):
+    if layout_algo == 'Spring Layout':
+        return nx.spring_layout(G, k=k)
+    elif layout_algo == 'Circular Layout':
+        return nx.circular_layout(G)
+    elif layout_algo == 'Kamada-Kawai Layout':
+        return nx.kamada_kawai_layout(G)
+    elif layout_algo == 'Spectral Layout':
+        return nx.spectral_layout(G)
+    elif layout_algo == 'Shell Layout':
+        return nx.shell_layout(G)
+    elif layout_algo == 'Sparse Stress Layout':
+        return layout_helpers.sparse_stress_layout(G)
+
+def compute_layout(G, layout_algo, k=20):
+    """
+    returns node positions for G, memoized in an LRU keyed by graph fingerprint and
+    layout settings. the returned dict is shared between callers, don't mutate it
+    """
+    key = (graph_fingerprint(G), layout_algo, k if layout_algo == 'Spring Layout' else None)
+    with _layout_cache_lock:
+        if key in _layout_cache:
+            _layout_cache.move_to_end(key)
+            perf.annotate(cache_hit=True)
+            return _layout_cache[key]
+
+    perf.annotate(cache_hit=False)
+    with perf.span("layout", algo=layout_algo, nodes=G.number_of_nodes(), edges=G.number_of_edges()):
+        pos = _run_layout(G, layout_algo, k)
+
+    with _layout_cache_lock:
+        _layout_cache[key] = pos
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return pos
+
+def create_edge_traces(G, pos, edge_scaling_factor, n_buckets=EDGE_WIDTH_BUCKETS, use_webgl=None, compact=COMPACT_PAYLOADS):
+    """
+    groups edges into n_buckets equal-width weight bins and draws each bin as a single
+    None-separated line trace with the bin's mean width, instead of one trace per edge.
+    compact traces hold float32 arrays with NaN as the separator
+    """
+    edges = list(G.edges(data='weight'))
+    if not edges:
+        return []
+    if use_webgl is None:
+        use_webgl = len(edges) > WEBGL_EDGE_THRESHOLD
+    scatter = go.Scattergl if use_webgl else go.Scatter
+
+    weights = np.array([weight for _, _, weight in edges], dtype=float)
+    lo, hi = weights.min(), weights.max()
+    if hi > lo:
+        buckets = np.minimum(((weights - lo) / (hi - lo) * n_buckets).astype(int), n_buckets - 1)
+    else:
+        buckets = np.zeros(len(edges), dtype=int)
+
+    gap = np.nan if compact else None
+    edge_traces = []
+    for bucket in np.unique(buckets):
+        members = np.flatnonzero(buckets == bucket)
+        x, y = [], []
+        for i in members:
+            node1, node2, _ = edges[i]
+            x0, y0 = pos[node1]
+            x1, y1 = pos[node2]
+            x += [x0, x1, gap]
+            y += [y0, y1, gap]
+        if compact:
+            x, y = np.array(x, dtype=np.float32), np.array(y, dtype=np.float32)
+        edge_traces.append(scatter(
+            x=x, y=y,
+            line=dict(width=weights[members].mean() * edge_scaling_factor, color='black'),
+            hoverinfo='none',
+            mode='lines',
+            name='Edges'))
+    return edge_traces
+
+def create_network_graph(category, filtered_pairs, dates_for_title, layout_algo, k=20, edge_scaling_factor=0.1, normalize=True, height=600,
+                         top_k=None, alpha=None, max_edges=None, compact=COMPACT_PAYLOADS):
+    """
+    top_k, alpha and max_edges prune the pairs to their backbone before layout (see
+    graph_helpers.backbone_pairs); pairs from get_skill_frequencies_data are usually pruned already
+    """
+    filtered_pairs = backbone_pairs(filtered_pairs, top_k=top_k, alpha=alpha, max_edges=max_edges)
 
     G = nx.Graph()
     
@@ -271,29 +492,10 @@ def create_network_graph(category, filtered_pairs, dates_for_title, layout_algo,
         for edge in G.edges(data=True):
             edge[2]['weight'] /= max_weight
     
-    if layout_algo == 'Spring Layout':
-        pos = nx.spring_layout(G, k=k)
-    elif layout_algo == 'Circular Layout':
-        pos = nx.circular_layout(G)
-    elif layout_algo == 'Kamada-Kawai Layout':
-        pos = nx.kamada_kawai_layout(G)
-    elif layout_algo == 'Spectral Layout':
-        pos = nx.spectral_layout(G)
-    elif layout_algo == 'Shell Layout':
-        pos = nx.shell_layout(G)
+    pos = compute_layout(G, layout_algo, k=k)
 
     # create edges with color and thickness based on weight
-    edge_traces = []
-    for edge in G.edges(data=True):
-        node1, node2, edge_attr = edge
-        x0, y0 = pos[node1]
-        x1, y1 = pos[node2]
-        edge_traces.append(go.Scatter(
-            x=[x0, x1, None], y=[y0, y1, None],
-            line=dict(width=edge_attr['weight'] * edge_scaling_factor, color='black'),
-            hoverinfo='none',
-            mode='lines',
-            name='Edges'))
+    edge_traces = create_edge_traces(G, pos, edge_scaling_factor, compact=compact)
 
     # create nodes with size based on degree
     node_x = []
@@ -302,6 +504,8 @@ def create_network_graph(category, filtered_pairs, dates_for_title, layout_algo,
         x, y = pos[node]
         node_x.append(x)
         node_y.append(y)
+    if compact:
+        node_x, node_y = np.array(node_x, dtype=np.float32), np.array(node_y, dtype=np.float32)
 
     node_trace = go.Scatter(
         x=node_x, y=node_y,
@@ -324,7 +528,11 @@ def create_network_graph(category, filtered_pairs, dates_for_title, layout_algo,
         node_text.append(f'{node}<br>: {len(adjacencies)}')
 
     # size nodes based on degree
-    node_trace.marker.size = [1 + adjacencies * 1.5 for adjacencies in node_adjacencies]
+    if compact:
+        node_adjacencies = np.array(node_adjacencies, dtype=np.int32)
+        node_trace.marker.size = (1 + node_adjacencies * 1.5).astype(np.float32)
+    else:
+        node_trace.marker.size = [1 + adjacencies * 1.5 for adjacencies in node_adjacencies]
     node_trace.marker.color = node_adjacencies
     node_trace.text = node_text
 
@@ -0,0 +1,198 @@
+"""
+renders every dashboard figure ahead of time, once per data version.
+
+    python prerender.py build [--workers 4] [--edge-scaling 3.0 5.0]   # after the nightly refresh
+
+figures are built with the same data getters and plot_helpers builders the page uses,
+on a process pool, and written as plotly json to FIGURES_DIR/<api>/<data version>/, <api>
+being a digest of the API_BASE_URL they were fetched from, so workers pointed at another
+api never load them. the directory is assembled under a temporary name and renamed into
+place when complete.
+jobs-app.py asks load_figure() first and only renders live on a miss, e.g. before the
+build has run or for a slider value that wasn't pre-rendered.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import http_cache
+import perf
+from lazy_imports import lazy_module
+
+pio = lazy_module("plotly.io")
+
+FIGURES_DIR = os.environ.get("FIGURES_DIR", os.path.join(os.path.dirname(http_cache.CACHE_DIR), "figures"))
+# set to 0 to always render live
+PRERENDERED_FIGURES = os.environ.get("PRERENDERED_FIGURES", "1") != "0"
+
+# the heatmap never shows more than this many skills, however many the api returns
+HEATMAP_TOP_N = 40
+NETWORK_LAYOUT = "Kamada-Kawai Layout"
+# the edge scaling slider's default; other values are rendered live unless built with --edge-scaling
+DEFAULT_EDGE_SCALING = 3.0
+
+
+def network_date_range(today=None):
+    """
+    (start, end) shown in the network graph title: 2024-01-01 to the start of this month
+    """
+    today = today or date.today()
+    return date(2024, 1, 1), today.replace(day=1)
+
+
+def heatmap_figure(skill_proportions):
+    from plot_helpers import build_skill_matrix, create_skill_heatmap
+    with perf.span("reshape:skill_matrix"):
+        skill_matrix = build_skill_matrix(skill_proportions, top_n=HEATMAP_TOP_N)
+    return create_skill_heatmap(skill_matrix, height=700, width=800)
+
+
+def network_figure(job_category, skill_frequencies, edge_scaling_factor=DEFAULT_EDGE_SCALING, dates_for_title=None):
+    from plot_helpers import create_network_graph
+    if dates_for_title is None:
+        dates_for_title = "{} to {}".format(*network_date_range())
+    return create_network_graph(
+        job_category, skill_frequencies, layout_algo=NETWORK_LAYOUT, k=0,
+        edge_scaling_factor=edge_scaling_factor, dates_for_title=dates_for_title
+    )
+
+
+def _api_dir():
+    import api_client
+    return os.path.join(FIGURES_DIR, hashlib.sha1(api_client.API_BASE_URL.encode()).hexdigest()[:12])
+
+
+def _version_dir(data_version):
+    return os.path.join(_api_dir(), data_version.replace(":", ""))
+
+
+def figure_filename(name, **params):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{name}-{digest}.json"
+
+
+def load_figure(data_version, name, **params):
+    """
+    the pre-rendered figure for name/params in data_version, or None
+    """
+    if not PRERENDERED_FIGURES:
+        return None
+    try:
+        with open(os.path.join(_version_dir(data_version), figure_filename(name, **params))) as f:
+            return pio.from_json(f.read())
+    except OSError:
+        return None
+
+
+def figure_jobs(edge_scalings=(DEFAULT_EDGE_SCALING,)):
+    """
+    (keep_predicted_jobs, job_category, seniority, country, edge_scalings) per pool task,
+    with arguments in the form the page passes them
+    """
+    from data_helpers import AVAILABLE_COUNTRIES, JOB_TITLES, SENIORITY_MAPPING
+    for keep_predicted_jobs in (False, True):
+        yield keep_predicted_jobs, None, None, None, ()
+    for job_category in JOB_TITLES:
+        for seniority in SENIORITY_MAPPING.values():
+            for country in AVAILABLE_COUNTRIES:
+                yield False, job_category, seniority, country.lower(), tuple(edge_scalings)
+
+
+def render(job):
+    """
+    renders one pool task's figures and returns [(filename, plotly json)]
+    """
+    import data_helpers
+    from data_helpers import DEFAULT_SMOOTHING_WINDOW
+    from plot_helpers import create_salary_plot, create_seniority_plot
+
+    keep_predicted_jobs, job_category, seniority, country, edge_scalings = job
+    data_version = http_cache.current_data_version()
+    if job_category is None:
+        # other smoothing windows are smoothed and rendered live from the same monthly series
+        seniority_stats = data_helpers.get_seniority_stats_data(
+            smoothing_window=DEFAULT_SMOOTHING_WINDOW, keep_predicted_jobs=keep_predicted_jobs, data_version=data_version
+        )
+        salary_stats = data_helpers.get_salary_stats_data(
+            by="median", smoothing_window=DEFAULT_SMOOTHING_WINDOW, keep_predicted_jobs=keep_predicted_jobs,
+            data_version=data_version
+        )
+        figure_params = dict(keep_predicted_jobs=keep_predicted_jobs, smoothing_window=DEFAULT_SMOOTHING_WINDOW)
+        return [
+            (figure_filename("seniority_plot", **figure_params), create_seniority_plot(seniority_stats).to_json()),
+            (figure_filename("salary_plot", **figure_params), create_salary_plot(salary_stats).to_json()),
+        ]
+
+    futures = data_helpers.prefetch_dashboard_data(job_category, seniority, country, keep_predicted_jobs=keep_predicted_jobs)
+    combo = dict(job_category=job_category, seniority=seniority, country=country)
+    rendered = [(figure_filename("skill_heatmap", **combo), heatmap_figure(futures["skill_proportions"].result()).to_json())]
+    dates_for_title = "{} to {}".format(*network_date_range())
+    skill_frequencies = futures["skill_frequencies"].result()
+    for edge_scaling_factor in edge_scalings:
+        # the layout is computed once per combination and reused across scalings
+        fig = network_figure(job_category, skill_frequencies, edge_scaling_factor, dates_for_title)
+        filename = figure_filename(
+            "network_graph", **combo, edge_scaling_factor=edge_scaling_factor, dates_for_title=dates_for_title
+        )
+        rendered.append((filename, fig.to_json()))
+    return rendered
+
+
+def _init_worker():
+    import api_client
+    # figures are published as the current data version, so never render them from stale data
+    api_client.SERVE_STALE = False
+
+
+def build(workers=None, edge_scalings=(DEFAULT_EDGE_SCALING,), keep=2):
+    """
+    renders every figure for the current data version and swaps the directory into place
+    """
+    data_version = http_cache.current_data_version()
+    final_dir = _version_dir(data_version)
+    tmp_dir = f"{final_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir)
+
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for rendered in pool.map(render, figure_jobs(edge_scalings)):
+            for filename, serialized in rendered:
+                with open(os.path.join(tmp_dir, filename), "w") as f:
+                    f.write(serialized)
+                count += 1
+
+    # a rebuild of the same version moves the old directory aside first;
+    # pages rendering in between fall back to live rendering
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir + ".old", ignore_errors=True)
+        os.rename(final_dir, final_dir + ".old")
+    os.rename(tmp_dir, final_dir)
+    shutil.rmtree(final_dir + ".old", ignore_errors=True)
+
+    versions = sorted(path for path in glob.glob(os.path.join(_api_dir(), "*")) if os.path.isdir(path) and not path.endswith(".tmp"))
+    for old in versions[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+    return final_dir, count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="pre-render every figure for the current data version")
+    build_parser.add_argument("--workers", type=int, default=None, help="processes (default: one per cpu)")
+    build_parser.add_argument("--edge-scaling", type=float, nargs="+", default=[DEFAULT_EDGE_SCALING],
+                              help="network graph edge scaling values to render")
+    build_parser.add_argument("--keep", type=int, default=2, help="data versions to keep on disk")
+    args = parser.parse_args()
+
+    final_dir, count = build(args.workers, args.edge_scaling, args.keep)
+    print(f"wrote {count} figures to {final_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+a local job x skill incidence matrix, for skill co-occurrence counts over any date range
+and sidebar selection without a request per combination.
+
+rows are jobs sorted by posting month and columns are skills; a 1 means the posting asks
+for the skill. each job's month, category, country and seniority are kept alongside as
+numpy arrays, so a selection is a contiguous month slice narrowed by a boolean mask, and
+the co-occurrence counts of the selected jobs are the off-diagonal of X^T X over their rows.
+"""
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+sp = lazy_module("scipy.sparse")
+
+# per-job columns besides job_id and skill, in the form the api paths use them
+LABEL_COLUMNS = ("job_category", "country", "binned_seniority")
+# the sidebar's country value that doesn't filter
+ALL_COUNTRIES = "all"
+
+
+def _month(value):
+    return np.datetime64(pd.Timestamp(value).strftime("%Y-%m"), "M")
+
+
+class SkillIncidence:
+    def __init__(self, matrix, skills, months, labels):
+        self.matrix = matrix  # csr, (jobs, skills), uint8, rows in month order
+        self.skills = skills
+        self.months = months  # datetime64[M] per row
+        self.labels = labels  # {column: pd.Categorical per row}
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        builds the matrix from /job_skills rows: one per (job_id, skill), each carrying its
+        job's year_month and LABEL_COLUMNS
+        """
+        job_codes, _ = pd.factorize(df["job_id"])
+        skill_codes, skills = pd.factorize(df["skill"], sort=True)
+        # job attributes from each job's first row, in job code order
+        _, first_rows = np.unique(job_codes, return_index=True)
+        jobs = df.iloc[first_rows]
+
+        months = pd.to_datetime(jobs["year_month"]).to_numpy().astype("datetime64[M]")
+        order = np.argsort(months, kind="stable")
+        row_of_job = np.empty_like(order)
+        row_of_job[order] = np.arange(len(order))
+
+        matrix = sp.csr_matrix(
+            (np.ones(len(df), dtype=np.uint8), (row_of_job[job_codes], skill_codes)),
+            shape=(len(order), len(skills)),
+        )
+        # a skill listed twice for one job still counts once
+        matrix.data[:] = 1
+        labels = {column: pd.Categorical(jobs[column].to_numpy()[order]) for column in LABEL_COLUMNS}
+        return cls(matrix, np.asarray(skills), months[order], labels)
+
+    @property
+    def n_jobs(self):
+        return self.matrix.shape[0]
+
+    def month_range(self):
+        """
+        (first, last) posting month as datetime64[M], or None without jobs
+        """
+        return (self.months[0], self.months[-1]) if self.n_jobs else None
+
+    def select(self, start=None, end=None, job_category=None, country=None, seniority=None):
+        """
+        row numbers of the jobs posted in [start, end] (whole months, either end open
+        when None) matching every filter that is set
+        """
+        lo = np.searchsorted(self.months, _month(start), side="left") if start is not None else 0
+        hi = np.searchsorted(self.months, _month(end), side="right") if end is not None else self.n_jobs
+        mask = np.ones(max(hi - lo, 0), dtype=bool)
+        for column, value in (("job_category", job_category), ("country", country), ("binned_seniority", seniority)):
+            if value is None or (column == "country" and value == ALL_COUNTRIES):
+                continue
+            labels = self.labels[column]
+            if value not in labels.categories:
+                return np.arange(0)
+            mask &= labels.codes[lo:hi] == labels.categories.get_loc(value)
+        return lo + np.flatnonzero(mask)
+
+    def cooccurrence(self, rows):
+        """
+        (skills x skills upper-triangular coo matrix of pair counts, per-skill job counts)
+        over the given rows
+        """
+        # counts overflow uint8, so the product is taken in int32
+        X = self.matrix[rows].astype(np.int32)
+        counts = (X.T @ X).tocsr()
+        return sp.triu(counts, k=1, format="coo"), counts.diagonal()
+
+    def pairs(self, start=None, end=None, job_category=None, country=None, seniority=None, proportion_threshold=0.01):
+        """
+        co-occurrence pairs in the /skill_frequencies form ([{"pair": [a, b], "count": n}, ...],
+        heaviest first) for a select(), keeping pairs that co-occur in at least
+        proportion_threshold of the selected jobs
+        """
+        rows = self.select(start, end, job_category=job_category, country=country, seniority=seniority)
+        if not len(rows):
+            return []
+        counts, _ = self.cooccurrence(rows)
+        keep = counts.data >= max(proportion_threshold * len(rows), 1)
+        a, b, n = counts.row[keep], counts.col[keep], counts.data[keep]
+        order = np.lexsort((b, a, -n))
+        return [
+            {"pair": [self.skills[i], self.skills[j]], "count": int(count)}
+            for i, j, count in zip(a[order].tolist(), b[order].tolist(), n[order].tolist())
+        ]
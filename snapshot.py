@@ -0,0 +1,204 @@
+"""
+memory-mapped snapshots of every api response the dashboard uses, one file per data version.
+
+    python snapshot.py build    # once the nightly refresh is done, e.g. from cron
+    python snapshot.py info
+
+a snapshot file is a small json index followed by one arrow ipc stream per request.
+every worker maps the same file read-only, so the os page cache holds a single copy of
+the data for all processes on the machine, and a freshly started worker has it without
+a request. api_client consults the snapshot for the current data version before its
+disk cache. builds are written to a temp file and renamed into place, so readers only
+ever see a complete snapshot, and workers move to the new file when
+http_cache.current_data_version() rolls over. a snapshot records the api it was built
+from, and workers pointed at a different API_BASE_URL ignore it.
+"""
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import struct
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import http_cache
+from lazy_imports import lazy_module
+
+pa = lazy_module("pyarrow") if importlib.util.find_spec("pyarrow") is not None else None
+
+SNAPSHOT_DIR = os.environ.get("API_SNAPSHOT_DIR", os.path.join(os.path.dirname(http_cache.CACHE_DIR), "snapshots"))
+# set to 0 to ignore snapshots on disk and always go through the api
+SNAPSHOTS_ENABLED = os.environ.get("API_SNAPSHOTS", "1") != "0"
+
+MAGIC = b"JOBSNAP1"
+# arrow buffers stay aligned when every stream starts on a 64-byte boundary
+ALIGNMENT = 64
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def snapshot_key(path, params=None):
+    return http_cache.cache_key(path, params)
+
+
+def snapshot_path(data_version):
+    return os.path.join(SNAPSHOT_DIR, f"snapshot-{data_version.replace(':', '')}.arrows")
+
+
+class Snapshot:
+    """
+    a read-only mapping of one snapshot file. tables handed out reference the mapped
+    pages directly, so they stay valid after the file is replaced or deleted
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._buffer = pa.memory_map(path, "r").read_buffer()
+        if self._buffer.slice(0, len(MAGIC)).to_pybytes() != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        (header_length,) = struct.unpack("<Q", self._buffer.slice(len(MAGIC), 8).to_pybytes())
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._buffer.slice(header_start, header_length).to_pybytes())
+        self.data_version = header["data_version"]
+        self.created_at = header["created_at"]
+        # snapshots written before the server was recorded never match
+        self.api_base_url = header.get("api_base_url")
+        self.entries = header["entries"]
+        self._body_start = _align(header_start + header_length)
+
+    def table(self, path, params=None):
+        entry = self.entries.get(snapshot_key(path, params))
+        if entry is None:
+            return None
+        stream = self._buffer.slice(self._body_start + entry["offset"], entry["length"])
+        return pa.ipc.open_stream(stream).read_all()
+
+
+def write_snapshot(path, data_version, tables, api_base_url):
+    """
+    writes {key: pyarrow.Table}, fetched from api_base_url, to path atomically
+    """
+    streams = {}
+    for key, table in tables.items():
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        streams[key] = sink.getvalue()
+
+    entries, offset = {}, 0
+    for key, stream in streams.items():
+        entries[key] = {"offset": offset, "length": stream.size}
+        offset = _align(offset + stream.size)
+    header = json.dumps({
+        "data_version": data_version,
+        "api_base_url": api_base_url,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "entries": entries,
+    }).encode()
+    body_start = _align(len(MAGIC) + 8 + len(header))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for key, stream in streams.items():
+            f.write(b"\0" * (body_start + entries[key]["offset"] - f.tell()))
+            f.write(stream)
+    os.replace(tmp, path)
+
+
+def current_snapshot():
+    """
+    returns the Snapshot for the current data version, or None if it hasn't been built
+    or was built from a different api than api_client.API_BASE_URL
+    """
+    if pa is None or not SNAPSHOTS_ENABLED:
+        return None
+    import api_client
+
+    data_version = http_cache.current_data_version()
+    snapshot = _snapshots.get(data_version)
+    if snapshot is None:
+        path = snapshot_path(data_version)
+        if not os.path.exists(path):
+            return None
+        with _snapshots_lock:
+            if data_version not in _snapshots:
+                # earlier versions are unmapped once the last table using them is gone
+                _snapshots.clear()
+                _snapshots[data_version] = Snapshot(path)
+            snapshot = _snapshots[data_version]
+    return snapshot if snapshot.api_base_url == api_client.API_BASE_URL else None
+
+
+def lookup(path, params=None):
+    """
+    the snapshotted response for path/params as a pyarrow.Table, or None
+    """
+    snapshot = current_snapshot()
+    return snapshot.table(path, params) if snapshot is not None else None
+
+
+def build(keep=2):
+    """
+    fetches every dashboard request for the current data version into a new snapshot
+    and deletes all but the newest `keep` snapshots
+    """
+    import api_client
+    from data_helpers import dashboard_requests
+
+    data_version = http_cache.current_data_version()
+    wanted = list(dashboard_requests())
+
+    def fetch(request):
+        path, params = request
+        # a snapshot is published as the current data version, so expired entries are refetched first
+        entry = api_client.fetch(path, params=params, accept=api_client.FRAME_ACCEPT, serve_stale=False)
+        frame = api_client.decode_frame(entry.content, entry.content_type)
+        return snapshot_key(path, params), pa.Table.from_pandas(frame, preserve_index=False)
+
+    with ThreadPoolExecutor(max_workers=api_client.POOL_SIZE, thread_name_prefix="snapshot") as pool:
+        tables = dict(pool.map(fetch, wanted))
+
+    path = snapshot_path(data_version)
+    write_snapshot(path, data_version, tables, api_client.API_BASE_URL)
+
+    # unlinking is safe while workers still map an old file
+    for old in sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "snapshot-*.arrows")))[:-keep]:
+        os.remove(old)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="snapshot every dashboard request for the current data version")
+    build_parser.add_argument("--keep", type=int, default=2, help="snapshots to keep on disk")
+    commands.add_parser("info", help="describe the snapshot for the current data version")
+    args = parser.parse_args()
+
+    if pa is None:
+        sys.exit("snapshots need pyarrow")
+    if args.command == "build":
+        path = build(keep=args.keep)
+        print(f"wrote {path} ({os.path.getsize(path) / 2**20:.1f} MiB)")
+        return
+
+    snapshot = current_snapshot()
+    if snapshot is None:
+        import api_client
+        sys.exit(f"no snapshot of {api_client.API_BASE_URL} for data version {http_cache.current_data_version()} in {SNAPSHOT_DIR}")
+    print(f"{snapshot.path}: {snapshot.api_base_url}, data version {snapshot.data_version}, {len(snapshot.entries)} requests, "
+          f"{os.path.getsize(snapshot.path) / 2**20:.1f} MiB, built {snapshot.created_at}")
+
+
+if __name__ == "__main__":
+    main()